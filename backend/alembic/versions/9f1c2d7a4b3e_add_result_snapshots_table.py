@@ -0,0 +1,44 @@
+"""add result_snapshots table
+
+Revision ID: 9f1c2d7a4b3e
+Revises: 5c27b06ebf16
+Create Date: 2026-10-18 01:51:08.236514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f1c2d7a4b3e'
+down_revision: Union[str, None] = '5c27b06ebf16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('result_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('analysis_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('principal', sa.Float(), nullable=False),
+    sa.Column('interest_week', sa.Float(), nullable=False),
+    sa.Column('projection_period', sa.Integer(), nullable=False),
+    sa.Column('tax_rate', sa.Float(), nullable=True),
+    sa.Column('additional_deposit', sa.Float(), nullable=True),
+    sa.Column('deposit_frequency', sa.Integer(), nullable=True),
+    sa.Column('regular_withdrawal', sa.Float(), nullable=True),
+    sa.Column('withdrawal_frequency', sa.Integer(), nullable=True),
+    sa.Column('generated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['analysis_id'], ['analysis_parameters.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('analysis_id', 'kind', name='uq_result_snapshots_analysis_kind')
+    )
+    op.create_index(op.f('ix_result_snapshots_id'), 'result_snapshots', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_result_snapshots_id'), table_name='result_snapshots')
+    op.drop_table('result_snapshots')
@@ -0,0 +1,95 @@
+"""add analysis summary columns
+
+Revision ID: c7d2e9a4f1b8
+Revises: b4e8a1f0c2d6
+Create Date: 2026-10-18 02:14:37.509126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2e9a4f1b8'
+down_revision: Union[str, None] = 'b4e8a1f0c2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SUMMARY_COLUMNS = ('final_balance', 'total_deposits', 'total_withdrawals', 'total_tax', 'total_interest')
+SNAPSHOT_FIELDS = (
+    'principal', 'interest_week', 'projection_period', 'tax_rate',
+    'additional_deposit', 'deposit_frequency', 'regular_withdrawal', 'withdrawal_frequency',
+)
+# Snapshot summaries are written in executemany batches of this size
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    for name in SUMMARY_COLUMNS:
+        op.add_column('analysis_parameters', sa.Column(name, sa.Float(), nullable=True))
+    op.add_column('analysis_parameters', sa.Column('computed_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_analysis_parameters_final_balance'), 'analysis_parameters', ['final_balance'], unique=False)
+
+    # Backfill from the saved weekly results in one statement
+    totals = {'total_deposits': 'additional_deposit', 'total_withdrawals': 'withdrawal',
+              'total_tax': 'tax_deduction', 'total_interest': 'interest'}
+    saved = "FROM analysis_results r WHERE r.analysis_id = analysis_parameters.id"
+    op.execute(
+        "UPDATE analysis_parameters SET "
+        f"final_balance = (SELECT r.ending_balance {saved} ORDER BY r.week DESC LIMIT 1), "
+        + "".join(f"{name} = (SELECT sum(r.{column}) {saved}), " for name, column in totals.items())
+        + f"computed_at = (SELECT max(r.generated_at) {saved}) "
+        f"WHERE EXISTS (SELECT 1 {saved})"
+    )
+
+    # Analyses saved in virtual mode only have a permanent snapshot; project those here
+    connection = op.get_bind()
+    snapshots = connection.execute(sa.text(
+        f"SELECT s.analysis_id, s.generated_at, {', '.join(f's.{field}' for field in SNAPSHOT_FIELDS)} "
+        "FROM result_snapshots s WHERE s.kind = 'permanent' "
+        "AND NOT EXISTS (SELECT 1 FROM analysis_results r WHERE r.analysis_id = s.analysis_id)"
+    )).all()
+    update = sa.text(
+        f"UPDATE analysis_parameters SET {', '.join(f'{name} = :{name}' for name in SUMMARY_COLUMNS)}, "
+        "computed_at = :computed_at WHERE id = :id"
+    )
+    params = [
+        {"id": snapshot.analysis_id, "computed_at": snapshot.generated_at, **_summary(snapshot)}
+        for snapshot in snapshots
+    ]
+    for start in range(0, len(params), BATCH_SIZE):
+        connection.execute(update, params[start:start + BATCH_SIZE])
+
+
+def _summary(snapshot):
+    # Weekly recurrence as of this revision, kept here so later changes to app code
+    # cannot change what this migration computes
+    balance = snapshot.principal
+    rate = (snapshot.interest_week or 0.0) / 100
+    tax_rate = (snapshot.tax_rate or 0.0) / 100
+    summary = dict.fromkeys(SUMMARY_COLUMNS, 0.0)
+    for week in range(1, max(snapshot.projection_period or 0, 0) + 1):
+        interest = balance * rate
+        tax = interest * tax_rate
+        deposit = _paid(week, snapshot.deposit_frequency, snapshot.additional_deposit)
+        withdrawal = _paid(week, snapshot.withdrawal_frequency, snapshot.regular_withdrawal)
+        balance = balance + deposit + interest - withdrawal - tax
+        summary['total_deposits'] += deposit
+        summary['total_withdrawals'] += withdrawal
+        summary['total_tax'] += tax
+        summary['total_interest'] += interest
+    summary['final_balance'] = balance
+    return summary
+
+
+def _paid(week, frequency, amount):
+    return (amount or 0.0) if frequency and frequency > 0 and week % frequency == 0 else 0.0
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_analysis_parameters_final_balance'), table_name='analysis_parameters')
+    op.drop_column('analysis_parameters', 'computed_at')
+    for name in reversed(SUMMARY_COLUMNS):
+        op.drop_column('analysis_parameters', name)
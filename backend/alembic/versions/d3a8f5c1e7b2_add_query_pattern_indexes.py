@@ -0,0 +1,48 @@
+"""add query pattern indexes
+
+Revision ID: d3a8f5c1e7b2
+Revises: c7d2e9a4f1b8
+Create Date: 2026-10-18 02:20:41.143870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f5c1e7b2'
+down_revision: Union[str, None] = 'c7d2e9a4f1b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built CONCURRENTLY so writes to the result tables continue during the build; that
+    # cannot run inside a transaction. A failed build leaves an INVALID index: drop it and rerun.
+    with op.get_context().autocommit_block():
+        # Per-analysis lookups, deletes and latest-week scans
+        op.create_index('ix_staging_results_analysis_id_week', 'staging_results', ['analysis_id', 'week'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_analysis_results_analysis_id_week', 'analysis_results', ['analysis_id', 'week'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_permanent_results_analysis_id_week', 'permanent_results', ['analysis_id', 'week'], unique=False, postgresql_concurrently=True)
+
+        # generated_at ranges of reports and queries. Result rows are appended in time order, so
+        # BRIN fits; snapshots are replaced in place per analysis, so they get a B-tree
+        op.create_index('ix_analysis_results_generated_at_brin', 'analysis_results', ['generated_at'], unique=False, postgresql_using='brin', postgresql_concurrently=True)
+        op.create_index('ix_result_snapshots_generated_at', 'result_snapshots', ['generated_at'], unique=False, postgresql_concurrently=True)
+
+        # Per-user listings and (created_at, id) keyset pages
+        op.create_index('ix_analysis_parameters_user_id_created_at', 'analysis_parameters', ['user_id', 'created_at'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_analysis_parameters_created_at_id', 'analysis_parameters', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_analysis_parameters_created_at_id', table_name='analysis_parameters', postgresql_concurrently=True)
+        op.drop_index('ix_analysis_parameters_user_id_created_at', table_name='analysis_parameters', postgresql_concurrently=True)
+        op.drop_index('ix_result_snapshots_generated_at', table_name='result_snapshots', postgresql_concurrently=True)
+        op.drop_index('ix_analysis_results_generated_at_brin', table_name='analysis_results', postgresql_using='brin', postgresql_concurrently=True)
+        op.drop_index('ix_permanent_results_analysis_id_week', table_name='permanent_results', postgresql_concurrently=True)
+        op.drop_index('ix_analysis_results_analysis_id_week', table_name='analysis_results', postgresql_concurrently=True)
+        op.drop_index('ix_staging_results_analysis_id_week', table_name='staging_results', postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""add refresh token revoked reason
+
+Revision ID: f2a6d8c4b9e3
+Revises: e5b1c9d2a6f4
+Create Date: 2026-10-18 02:31:52.418307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6d8c4b9e3'
+down_revision: Union[str, None] = 'e5b1c9d2a6f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('refresh_tokens', sa.Column('revoked_reason', sa.String(), nullable=True))
+    op.create_index(op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'], unique=False)
+
+    # Existing revocations cannot be told apart; treat them as rotations so reuse detection still holds
+    op.execute("UPDATE refresh_tokens SET revoked_reason = 'rotated' WHERE revoked_at IS NOT NULL")
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens')
+    op.drop_column('refresh_tokens', 'revoked_reason')
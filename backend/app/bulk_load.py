@@ -0,0 +1,125 @@
+"""Bulk writes of weekly result rows without building ORM objects.
+
+On psycopg2 rows are streamed with COPY FROM STDIN: projection columns go in
+Postgres' binary COPY format, packed straight from the NumPy arrays, and other row
+sets as CSV. Other drivers fall back to a Core executemany insert
+(insertmanyvalues / execute_values). write_columns_async does the same for an
+AsyncSession, using asyncpg's binary copy_records_to_table. Writes go through the
+session's connection, so they share its transaction and the caller commits.
+
+Throughput target: a 10,000-week projection (one ~1 MB binary COPY, packed in a
+few milliseconds) commits in under 200 ms on a local Postgres, at least 5x faster
+than bulk_insert_mappings and far ahead of per-row db.add.
+"""
+import csv
+import io
+from itertools import repeat
+import numpy as np
+from sqlalchemy import BigInteger, Float, Integer, SmallInteger, insert
+
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00" + b"\x00\x00\x00\x00" * 2  # signature, flags, header extension
+COPY_TRAILER = b"\xff\xff"
+# Column type -> big-endian NumPy code of its binary COPY value
+BINARY_CODES = {SmallInteger: ">i2", Integer: ">i4", BigInteger: ">i8", Float: ">f8"}
+
+
+def write_rows(db, model, names, rows):
+    """Write `rows` (tuples ordered like `names`) into `model`'s table. Returns the row count."""
+    connection = db.connection()
+
+    if connection.dialect.driver == "psycopg2":
+        buffer = io.StringIO()
+        count = _write_csv(buffer, rows)
+        buffer.seek(0)
+        _copy(connection, model, names, buffer, "csv")
+        return count
+
+    mappings = [dict(zip(names, row)) for row in rows]
+    if mappings:
+        db.execute(insert(model.__table__), mappings)
+    return len(mappings)
+
+
+def write_columns(db, model, columns, **constants):
+    """Write projection columns (dict of arrays, e.g. from projection_cache.columns).
+
+    Columns the table lacks are skipped; `constants` (e.g. analysis_id) are repeated
+    on every row.
+    """
+    table_columns = model.__table__.c
+    names = [name for name in columns if name in table_columns]
+    connection = db.connection()
+
+    if connection.dialect.driver == "psycopg2":
+        arrays = {name: columns[name] for name in names}
+        size = len(columns[names[0]]) if names else 0
+        arrays.update((name, np.full(size, value)) for name, value in constants.items())
+        buffer = _binary_rows(table_columns, arrays)
+        if buffer is not None:
+            _copy(connection, model, list(arrays), buffer, "binary")
+            return size
+
+    values = [columns[name].tolist() for name in names]
+    values += [repeat(value) for value in constants.values()]
+    return write_rows(db, model, names + list(constants), zip(*values))
+
+
+async def write_columns_async(db, model, columns, **constants):
+    """write_columns for an AsyncSession."""
+    names = [name for name in columns if name in model.__table__.c]
+    values = [columns[name].tolist() for name in names]
+    values += [repeat(value) for value in constants.values()]
+    names += list(constants)
+
+    connection = await db.connection()
+    if connection.dialect.driver == "asyncpg":
+        raw = (await connection.get_raw_connection()).driver_connection
+        # COPY only once the session's transaction is open on the server, else it would autocommit
+        if raw.is_in_transaction():
+            records = list(zip(*values))
+            await raw.copy_records_to_table(model.__table__.name, records=records, columns=names)
+            return len(records)
+
+    mappings = [dict(zip(names, row)) for row in zip(*values)]
+    if mappings:
+        await db.execute(insert(model.__table__), mappings)
+    return len(mappings)
+
+
+def _copy(connection, model, names, buffer, format):
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {model.__table__.name} ({', '.join(names)}) FROM STDIN WITH (FORMAT {format})", buffer
+        )
+
+
+def _binary_rows(table_columns, arrays):
+    # Each tuple is an int16 field count, then per field an int32 byte length and the
+    # big-endian value. Only int2/int4/int8/float8 columns are packed; anything else returns None.
+    fields = [("count", ">i2")]
+    for name in arrays:
+        column_type = table_columns[name].type
+        # Exact types: BigInteger subclasses Integer and REAL subclasses Float, and
+        # packing either at the wrong width would corrupt the stream
+        code = BINARY_CODES.get(type(column_type))
+        if code is None or getattr(column_type, "precision", None) is not None:
+            return None
+        fields += [(f"{name}__length", ">i4"), (name, code)]
+
+    size = len(next(iter(arrays.values()))) if arrays else 0
+    packed = np.empty(size, dtype=np.dtype(fields))
+    packed["count"] = len(arrays)
+    for name, values in arrays.items():
+        packed[f"{name}__length"] = packed.dtype[name].itemsize
+        packed[name] = values
+    return io.BytesIO(COPY_SIGNATURE + packed.tobytes() + COPY_TRAILER)
+
+
+def _write_csv(buffer, rows):
+    # csv formats floats with repr (round-trip exact) and None as an empty, i.e. NULL, field
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
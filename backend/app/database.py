@@ -1,7 +1,13 @@
+from contextvars import ContextVar
 from dotenv import load_dotenv
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.base import Base
 
 # Load .env file
@@ -13,9 +19,149 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set in the environment variables")
 
+# Async drivers for the sync URL's backend (override with ASYNC_DATABASE_URL)
+ASYNC_DRIVERS = {"postgres": "postgresql+asyncpg", "postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def async_database_url(url: str):
+    url = make_url(url)
+    url = url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+    if url.drivername == "postgresql+asyncpg" and "sslmode" in url.query:
+        # asyncpg spells libpq's sslmode as ssl
+        url = url.update_query_dict({"ssl": url.query["sslmode"]}).difference_update_query(["sslmode"])
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+
+# Pool settings, applied to the sync and the async engine (each has its own pool)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Hosted Postgres drops idle connections: recycle before it does and ping on checkout
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+POOL_OPTIONS = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
+
+class PoolMetrics:
+    """Counters for one engine's pool: checkouts, new connections, invalidations and checkout wait."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def watch(self, engine):
+        event.listen(engine, "checkout", lambda *args: self._count("checkouts"))
+        event.listen(engine, "connect", lambda *args: self._count("connects"))
+        event.listen(engine, "invalidate", lambda *args: self._count("invalidations"))
+        event.listen(engine, "soft_invalidate", lambda *args: self._count("invalidations"))
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def stats(self, pool):
+        with self._lock:
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_seconds_total": self.wait_seconds,
+                "wait_seconds_max": self.max_wait_seconds,
+                "wait_seconds_avg": self.wait_seconds / self.checkouts if self.checkouts else 0.0,
+            }
+
+
+def timed_pool(base, metrics):
+    """Subclass of pool class `base` that records how long each checkout waited."""
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return base._do_get(self)
+        finally:
+            metrics.record_wait(time.perf_counter() - started)
+
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+class QueryStats:
+    """SQL statements and time of one request, filled in by the cursor events below."""
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Set by the metrics middleware for the duration of a request; None outside requests
+current_query_stats: ContextVar = ContextVar("current_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += elapsed
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def time_queries(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+sync_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
 # SQLAlchemy Setup
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, poolclass=timed_pool(QueuePool, sync_pool_metrics), **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+sync_pool_metrics.watch(engine)
+time_queries(engine)
+
+# Async engine for the routers that await their queries
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, poolclass=timed_pool(AsyncAdaptedQueuePool, async_pool_metrics), **POOL_OPTIONS
+)
+async_pool_metrics.watch(async_engine.sync_engine)
+time_queries(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+def pool_stats():
+    return {
+        "sync": sync_pool_metrics.stats(engine.pool),
+        "async": async_pool_metrics.stats(async_engine.pool),
+    }
 
 # Function to get database session
 def get_db():
@@ -24,3 +170,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Async session dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,119 @@
+import numpy as np
+from app.projection import FINANCIAL_FIELDS, closed_form_balance
+
+# Candidates evaluated per bisection round; each round shrinks the bracket by this factor
+SECTIONS = 64
+MAX_ROUNDS = 12
+# Largest miss, relative to the target, a solved rate may leave
+RESIDUAL_TOLERANCE = 1e-6
+
+
+def final_balance(fields, **overrides):
+    """Closed-form final balance of `fields` (a dict of FINANCIAL_FIELDS) with overrides.
+
+    Overrides may be NumPy arrays, in which case one balance per candidate is returned.
+    """
+    values = {**fields, **overrides}
+    return closed_form_balance(
+        values["projection_period"],
+        values["principal"],
+        values["interest_week"],
+        values["tax_rate"] or 0.0,
+        values["additional_deposit"] or 0.0,
+        values["deposit_frequency"] or 0,
+        values["regular_withdrawal"] or 0.0,
+        values["withdrawal_frequency"] or 0,
+    )
+
+
+def solve_flow(fields, target, field):
+    """Deposit or withdrawal amount that reaches `target`.
+
+    The final balance is linear in either amount, so this inverts it exactly.
+    An unset frequency is taken as weekly.
+    """
+    frequency_field = "deposit_frequency" if field == "additional_deposit" else "withdrawal_frequency"
+    frequency = fields[frequency_field] or 1
+    base = final_balance(fields, **{field: 0.0, frequency_field: frequency})
+    per_unit = final_balance(fields, **{field: 1.0, frequency_field: frequency}) - base
+    if per_unit == 0:
+        raise ValueError(f"No {field} falls inside the projection period")
+
+    amount = (target - base) / per_unit
+    if amount < 0:
+        raise ValueError(f"Target is not reachable with a non-negative {field}")
+    return amount, {frequency_field: frequency}
+
+
+def solve_rate(fields, target, lower, upper):
+    """Weekly interest rate reaching `target`, by batched bisection.
+
+    Each round evaluates SECTIONS candidates in one vectorized call and keeps the
+    first sub-interval where the balance crosses the target. Candidates whose
+    balance overflows are skipped, and the result must land within RESIDUAL_TOLERANCE
+    of the target, so a jump across it (rather than a root) is reported as unreachable.
+    """
+    unreachable = f"Target is not reachable with interest_week between {lower} and {upper}"
+    for _ in range(MAX_ROUNDS):
+        candidates = np.linspace(lower, upper, SECTIONS + 1)
+        with np.errstate(all="ignore"):
+            gaps = final_balance(fields, interest_week=candidates) - target
+        finite = np.isfinite(gaps)
+        hits = np.flatnonzero(finite & (gaps == 0))
+        if hits.size:
+            return float(candidates[hits[0]])
+        signs = np.sign(gaps)
+        crossings = np.flatnonzero(finite[:-1] & finite[1:] & (signs[:-1] != signs[1:]))
+        if not crossings.size:
+            raise ValueError(unreachable)
+        lower, upper = candidates[crossings[0]], candidates[crossings[0] + 1]
+        if upper - lower < 1e-12:
+            break
+
+    rate = float((lower + upper) / 2)
+    with np.errstate(all="ignore"):
+        residual = final_balance(fields, interest_week=rate) - target
+    if not abs(residual) <= RESIDUAL_TOLERANCE * max(abs(target), 1.0):
+        raise ValueError(unreachable)
+    return rate
+
+
+def solve_horizon(fields, target, max_period):
+    """Fewest weeks after which the balance reaches `target`, scanning every horizon at once.
+
+    The direction comes from the principal: a target above it is reached when the
+    balance first rises to it, one below when it first falls to it. The first such
+    week is returned even if the balance later moves back across the target, which
+    can happen when deposits and withdrawals pull against the interest.
+    """
+    weeks = np.arange(0, max_period + 1)
+    balances = final_balance(fields, projection_period=weeks)
+    reached = balances >= target if target >= fields["principal"] else balances <= target
+    found = np.flatnonzero(reached)
+    if not found.size:
+        raise ValueError(f"Target is not reached within {max_period} weeks")
+    return int(weeks[found[0]])
+
+
+def goal_seek(analysis, target, solve_for, lower=-10.0, upper=10.0, max_period=5200):
+    """Solve one free parameter of `analysis` so its final balance equals `target`.
+
+    Returns the solved value, the method used and the full solved parameter set.
+    Raises ValueError when the target cannot be reached.
+    """
+    fields = {field: getattr(analysis, field) for field in FINANCIAL_FIELDS}
+    if solve_for in ("additional_deposit", "regular_withdrawal"):
+        value, adjusted = solve_flow(fields, target, solve_for)
+        fields.update(adjusted)
+        method = "closed_form"
+    elif solve_for == "interest_week":
+        value = solve_rate(fields, target, lower, upper)
+        method = "bisection"
+    elif solve_for == "projection_period":
+        value = solve_horizon(fields, target, max_period)
+        method = "search"
+    else:
+        raise ValueError(f"Cannot solve for {solve_for}")
+
+    fields[solve_for] = value
+    return value, method, fields
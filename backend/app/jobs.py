@@ -0,0 +1,141 @@
+"""In-process job queue for staging computations, with job state in the database.
+
+Jobs are rows in projection_jobs; JOB_WORKERS asyncio tasks per process take job
+ids off a local queue and claim them with an atomic queued -> running update, so
+status can be polled from any worker process and a job never runs twice.
+
+Jobs a process was running when it stopped are put back to queued on shutdown.
+A crash cannot do that, so on startup each process also re-queues jobs that have
+been running for longer than JOB_LEASE_SECONDS, then queues everything marked
+queued. The lease must exceed the longest real staging computation: a job past
+it is assumed dead and may run again (a staging save is safe to repeat).
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+import pytz
+from sqlalchemy import select, update
+from app import models
+from app.database import AsyncSessionLocal
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "900"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+logger = logging.getLogger(__name__)
+
+_queue = None
+_workers = []
+# Jobs claimed by this process and not finished yet
+_running = set()
+
+
+async def enqueue(db, analysis_id: int):
+    """Add a staging computation for `analysis_id`. Commits the session."""
+    job = models.ProjectionJob(analysis_id=analysis_id, status=QUEUED, progress=0.0)
+    db.add(job)
+    await db.commit()
+    if _queue is not None:
+        _queue.put_nowait(job.id)
+    return job
+
+
+async def set_progress(job_id: int, progress: float):
+    await _update(job_id, progress=progress)
+
+
+async def _update(job_id: int, **values):
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.ProjectionJob).where(models.ProjectionJob.id == job_id).values(**values))
+        await db.commit()
+
+
+async def run_job(job_id: int):
+    # Imported here: the analysis router imports this module to enqueue
+    from app.routers.analysis import save_analysis_results_to_staging
+
+    async with AsyncSessionLocal() as db:
+        claimed = await db.execute(
+            update(models.ProjectionJob)
+            .where(models.ProjectionJob.id == job_id, models.ProjectionJob.status == QUEUED)
+            .values(status=RUNNING, started_at=datetime.now(pytz.UTC))
+        )
+        await db.commit()
+        if claimed.rowcount != 1:
+            return
+        _running.add(job_id)
+
+        job = await db.get(models.ProjectionJob, job_id)
+        analysis = await db.get(models.AnalysisParameter, job.analysis_id)
+        try:
+            if analysis is None:
+                raise ValueError(f"Analysis {job.analysis_id} no longer exists")
+            await save_analysis_results_to_staging(
+                db, analysis.id, analysis, on_computed=lambda: set_progress(job_id, 0.5)
+            )
+        except Exception as e:
+            logger.error(f"🚨 Projection job {job_id} failed: {e}")
+            detail = getattr(e, "detail", None) or str(e)
+            await _update(job_id, status=FAILED, error=detail, finished_at=datetime.now(pytz.UTC))
+            _running.discard(job_id)
+            return
+
+    await _update(job_id, status=DONE, progress=1.0, finished_at=datetime.now(pytz.UTC))
+    _running.discard(job_id)
+    logger.info(f"✅ Projection job {job_id} done")
+
+
+async def _work():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await run_job(job_id)
+        except Exception as e:
+            logger.error(f"🚨 Projection job {job_id} crashed: {e}")
+        finally:
+            _queue.task_done()
+
+
+async def _requeue(*conditions):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(models.ProjectionJob)
+            .where(models.ProjectionJob.status == RUNNING, *conditions)
+            .values(status=QUEUED, progress=0.0, started_at=None)
+        )
+        await db.commit()
+
+
+async def start():
+    """Start the worker tasks and queue pending jobs, including running ones past their lease."""
+    global _queue
+    _queue = asyncio.Queue()
+    _workers.extend(asyncio.create_task(_work()) for _ in range(JOB_WORKERS))
+
+    await _requeue(models.ProjectionJob.started_at < datetime.now(pytz.UTC) - timedelta(seconds=JOB_LEASE_SECONDS))
+    async with AsyncSessionLocal() as db:
+        pending = await db.execute(
+            select(models.ProjectionJob.id).where(models.ProjectionJob.status == QUEUED).order_by(models.ProjectionJob.id)
+        )
+        for job_id in pending.scalars():
+            _queue.put_nowait(job_id)
+
+
+async def stop():
+    """Cancel the workers and put the jobs they were running back in the queue."""
+    global _queue
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+
+    if _running:
+        await _requeue(models.ProjectionJob.id.in_(_running))
+        logger.info(f"Re-queued {len(_running)} interrupted projection job(s)")
+        _running.clear()
@@ -1,23 +1,49 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from app.database import SessionLocal, engine
+from app.database import SessionLocal, async_engine, engine, pool_stats
+from app.oauth import principal_cache
+from app import passwords
+from app.metrics import MetricsMiddleware, mark_worker_stopped, metrics_response
 from app.routers import analysis
 from app.routers import manager
 from app.models import AnalysisParameter, AnalysisResult
 from app.schemas import AnalysisCreate
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+from app.logging_config import setup_logging
+import asyncio
+import logging
 import os
-from app import models
+import time
+from app import jobs, models
 from app.routers import auth 
 from app.routers import reports, api_reports 
 from app.routers import queries
+from app.routers import projections
 
 # Load environment variables
 load_dotenv()
 
+# Queue-based JSON logging; per-request lines are sampled
+setup_logging()
+logger = logging.getLogger(__name__)
+request_logger = logging.getLogger("app.requests")
+
+# Background projection workers and refresh-token cleanup run for the app's lifetime
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await jobs.start()
+    token_cleanup = asyncio.create_task(auth.prune_refresh_tokens_periodically())
+    yield
+    token_cleanup.cancel()
+    await jobs.stop()
+    mark_worker_stopped()
+
 # Define FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS setup
 origins = [
@@ -36,6 +62,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
 # Create tables
@@ -49,6 +76,7 @@ app.include_router(manager.router, prefix="/api/manager", tags=["Manager"])
 app.include_router(reports.router)
 app.include_router(queries.router, prefix="/api/queries")
 app.include_router(api_reports.router, prefix="/api")
+app.include_router(projections.router, prefix="/api/projections", tags=["Projections"])
 
 
 # Health check route (keep only one)
@@ -56,6 +84,11 @@ app.include_router(api_reports.router, prefix="/api")
 def health():
     return {"status": "Backend is alive!"}
 
+# Prometheus scrape endpoint: per-route latency, response size and DB time
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
 # Database session dependency
 def get_db():
     db = SessionLocal()
@@ -64,10 +97,28 @@ def get_db():
     finally:
         db.close()
 
-# DB health check
+# DB health check: a real round trip plus pool stats
 @app.get("/health")
-def health_check(db: Session = Depends(get_db)):
-    return {"status": "Database is connected"}
+async def health_check():
+    started = time.perf_counter()
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception:
+        # The driver's message names the host and user, so it stays in the server log
+        logger.exception("🚨 Health check could not reach the database")
+        return JSONResponse(
+            status_code=503,
+            content={"status": "Database is unreachable", "pool": pool_stats()},
+        )
+
+    return {
+        "status": "Database is connected",
+        "latency_ms": (time.perf_counter() - started) * 1000,
+        "pool": pool_stats(),
+        "auth_cache": principal_cache.stats(),
+        "password_hashing": passwords.stats(),
+    }
 
 # API route to create new analysis
 @app.post("/api/analysis/")
@@ -94,6 +145,20 @@ if __name__ == "__main__":
 def test():
     return {"message": "Backend is alive!"}
 @app.middleware("http")
-async def log_origin(request: Request, call_next):
-    print("🛰️ Request from:", request.headers.get("origin"))
-    return await call_next(request)
+async def log_requests(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    request_logger.info(
+        "request",
+        extra={
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "origin": request.headers.get("origin"),
+        },
+    )
+    return response
+
+# Added last so it wraps every other middleware and sees the full request time
+app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,158 @@
+"""Prometheus metrics for every HTTP request, served at /metrics.
+
+Latency, response size, DB time and statement count are histograms labelled by
+method, route template and status, so /api/analysis/{analysis_id} is one series
+however many ids are requested. Requests that match no route share the
+"<unmatched>" label.
+
+Each response also carries a Server-Timing header with the SQL statements and
+time spent before it started, and a request that runs more than
+QUERY_COUNT_WARN_THRESHOLD statements logs a warning, which is how N+1 loops
+show up.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory shared by the workers (start.sh does this): each worker writes its
+samples there and /metrics sums them, whichever worker answers the scrape.
+"""
+import logging
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.responses import Response
+
+from app.database import QueryStats, current_query_stats
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+# Statements per request above which a warning is logged; 0 turns the warning off
+QUERY_COUNT_WARN_THRESHOLD = int(os.getenv("QUERY_COUNT_WARN_THRESHOLD", 25))
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of the response",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Bytes in the response body",
+    ["method", "route", "status"],
+    buckets=SIZE_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL statements while serving a request",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "SQL statements executed while serving a request",
+    ["method", "route", "status"],
+    buckets=STATEMENT_BUCKETS,
+)
+# The route is only known after routing, so requests in flight are counted per method
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def server_timing(query_stats, elapsed):
+    """Server-Timing value: SQL time and statement count so far, plus total time to the first byte."""
+    return (
+        f'db;dur={query_stats.seconds * 1000:.1f};desc="{query_stats.statements} queries", '
+        f"total;dur={elapsed * 1000:.1f}"
+    ).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware: no request/response wrappers, streamed bodies are counted as they go out."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        size = 0
+        query_stats = QueryStats()
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = server_timing(query_stats, time.perf_counter() - started)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing)]}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        token = current_query_stats.set(query_stats)
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            current_query_stats.reset(token)
+
+            # The router stores the matched route in the scope we passed down
+            route = scope.get("route")
+            labels = (method, getattr(route, "path", UNMATCHED_ROUTE), str(status))
+            REQUEST_LATENCY.labels(*labels).observe(elapsed)
+            RESPONSE_SIZE.labels(*labels).observe(size)
+            REQUEST_DB_TIME.labels(*labels).observe(query_stats.seconds)
+            REQUEST_DB_STATEMENTS.labels(*labels).observe(query_stats.statements)
+
+            if 0 < QUERY_COUNT_WARN_THRESHOLD < query_stats.statements:
+                logger.warning(
+                    "query count threshold exceeded",
+                    extra={
+                        "method": method,
+                        "route": labels[1],
+                        "status": status,
+                        "statements": query_stats.statements,
+                        "db_ms": round(query_stats.seconds * 1000, 2),
+                    },
+                )
+
+
+def metrics_response():
+    """Current metrics in the Prometheus text format, summed over all workers in multiprocess mode."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_worker_stopped():
+    """Drop this worker's live gauges from the shared directory when it exits."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
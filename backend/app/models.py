@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, TIMESTAMP, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, TIMESTAMP, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -13,8 +13,27 @@ class User(Base):
     is_manager = Column(Integer, default=0)  # 0 for user, 1 for manager
 
 
+class RefreshToken(Base):
+    """Long-lived refresh token, stored as a SHA-256 of the token. Each one is used once, then rotated."""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String, nullable=False, unique=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    # "rotated", "logout" or "reuse"; only a rotated token presented again means it leaked
+    revoked_reason = Column(String, nullable=True)
+
+
 class AnalysisParameter(Base):
     __tablename__ = "analysis_parameters"
+    __table_args__ = (
+        # Per-user listings and the (created_at, id) keyset pages of the manager views
+        Index("ix_analysis_parameters_user_id_created_at", "user_id", "created_at"),
+        Index("ix_analysis_parameters_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))  # 🔗 Link to user
@@ -31,12 +50,22 @@ class AnalysisParameter(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Summary of the saved projection (analysis_results or the permanent snapshot), written on
+    # promotion and recalculation; staging edits leave it alone until they are promoted
+    final_balance = Column(Float, nullable=True, index=True)
+    total_deposits = Column(Float, nullable=True)
+    total_withdrawals = Column(Float, nullable=True)
+    total_tax = Column(Float, nullable=True)
+    total_interest = Column(Float, nullable=True)
+    computed_at = Column(DateTime(timezone=True), nullable=True)
+
     staging_results = relationship("StagingResult", back_populates="analysis", cascade="all, delete-orphan")
     user = relationship("User")
 
 
 class StagingResult(Base):
     __tablename__ = "staging_results"
+    __table_args__ = (Index("ix_staging_results_analysis_id_week", "analysis_id", "week"),)
 
     id = Column(Integer, primary_key=True, index=True)
     analysis_id = Column(Integer, ForeignKey("analysis_parameters.id"))
@@ -56,6 +85,11 @@ class StagingResult(Base):
 
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
+    __table_args__ = (
+        Index("ix_analysis_results_analysis_id_week", "analysis_id", "week"),
+        # Rows are appended in generated_at order, so a BRIN index covers date ranges at a fraction of a B-tree's size
+        Index("ix_analysis_results_generated_at_brin", "generated_at", postgresql_using="brin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     analysis_id = Column(Integer, ForeignKey("analysis_parameters.id"))
@@ -74,6 +108,7 @@ class AnalysisResult(Base):
 
 class PermanentResult(Base):
     __tablename__ = "permanent_results"
+    __table_args__ = (Index("ix_permanent_results_analysis_id_week", "analysis_id", "week"),)
 
     id = Column(Integer, primary_key=True, index=True)
     analysis_id = Column(Integer, ForeignKey("analysis_parameters.id"))
@@ -85,3 +120,51 @@ class PermanentResult(Base):
     tax_deduction = Column(Float)
     ending_balance = Column(Float)
     generated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ResultSnapshot(Base):
+    """Financial parameters a set of results was generated from.
+
+    Used instead of per-week rows when VIRTUAL_RESULTS is on: the weeks are
+    recomputed from this snapshot on read. kind is "staging" or "permanent".
+    """
+    __tablename__ = "result_snapshots"
+    __table_args__ = (
+        UniqueConstraint("analysis_id", "kind", name="uq_result_snapshots_analysis_kind"),
+        # Snapshots are replaced per analysis, so generated_at does not follow the physical order
+        Index("ix_result_snapshots_generated_at", "generated_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_id = Column(Integer, ForeignKey("analysis_parameters.id"), nullable=False)
+    kind = Column(String, nullable=False)
+    principal = Column(Float, nullable=False)
+    interest_week = Column(Float, nullable=False)
+    projection_period = Column(Integer, nullable=False)
+    tax_rate = Column(Float, nullable=True, default=0.0)
+    additional_deposit = Column(Float, nullable=True, default=0.0)
+    deposit_frequency = Column(Integer, nullable=True, default=1)
+    regular_withdrawal = Column(Float, nullable=True, default=0.0)
+    withdrawal_frequency = Column(Integer, nullable=True, default=1)
+    generated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    analysis = relationship("AnalysisParameter")
+
+
+class ProjectionJob(Base):
+    """A queued staging computation for an analysis (see app/jobs.py).
+
+    status moves queued -> running -> done | failed; progress is 0..1.
+    """
+    __tablename__ = "projection_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_id = Column(Integer, ForeignKey("analysis_parameters.id"), nullable=False)
+    status = Column(String, nullable=False, default="queued")
+    progress = Column(Float, nullable=False, default=0.0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    analysis = relationship("AnalysisParameter")
@@ -1,43 +1,142 @@
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import OrderedDict
 from . import models
-from .database import get_db
+from .database import get_async_db
+import hashlib
 import os
+import threading
+import time
 
 # Load secret from env (or use default if missing)
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "2h34f89b23r89vn2398rb2309")
 ALGORITHM = "HS256"
 
+# Seconds a verified token is trusted without a database lookup, and how many tokens are kept
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 60))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10_000))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user, detached from any session so it can be shared between requests."""
+    id: int
+    username: str
+    email: str
+    is_manager: int
+
+
+class PrincipalCache:
+    """LRU of verified tokens -> Principal, each entry valid for AUTH_CACHE_TTL or until the token expires.
+
+    Keys are a hash of the whole token, signature included, so only a token that
+    already passed verification can hit. Entries of a user are dropped when the
+    user row changes.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def token_id(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token_id):
+        with self._lock:
+            entry = self._entries.get(token_id)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[token_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token_id, principal, token_expires_at=None):
+        valid_for = self.ttl
+        if token_expires_at is not None:
+            valid_for = min(valid_for, token_expires_at - time.time())
+        if valid_for <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[token_id] = (principal, time.monotonic() + valid_for)
+            self._entries.move_to_end(token_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for token_id in [key for key, (principal, _) in self._entries.items() if principal.id == user_id]:
+                del self._entries[token_id]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(AUTH_CACHE_TTL, AUTH_CACHE_SIZE)
+
+
+# ✅ Any change to a user (role, email, deletion) through the ORM evicts its cached tokens
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+    token_id = principal_cache.token_id(token)
+    principal = principal_cache.get(token_id)
+    if principal is not None:
+        return principal
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: int = payload.get("user_id")
-        is_manager: int = payload.get("is_manager")  # 👈 NEW
-        if user_id is None or is_manager is None:
+        if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, user_id)
     if user is None:
         raise credentials_exception
 
-    user.is_manager = is_manager  # 👈 Attach manager flag from token
-    return user
+    # The role comes from the database, so a demotion applies as soon as the cache entry goes
+    principal = Principal(id=user.id, username=user.username, email=user.email, is_manager=user.is_manager)
+    principal_cache.put(token_id, principal, payload.get("exp"))
+    return principal
 
-def get_current_manager(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    user = get_current_user(token, db)
+async def get_current_manager(user: Principal = Depends(get_current_user)):
     if not user.is_manager:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,33 @@
+"""Opaque keyset cursors: the sort key and id of the last row of a page."""
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+
+def encode_cursor(sort_by: str, value, row_id: int):
+    payload = {"sort_by": sort_by, "value": value, "id": row_id}
+    if isinstance(value, datetime):
+        payload.update(value=value.isoformat(), type="datetime")
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str, sort_by: str):
+    """Return (value, id) from a cursor issued for `sort_by`; 400 if it is malformed."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if payload["sort_by"] != sort_by:
+            raise ValueError("cursor was issued for another sort")
+        value = payload["value"]
+        if payload.get("type") == "datetime":
+            value = datetime.fromisoformat(value)
+        return value, int(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+
+def keyset_after(sort_column, id_column, after, order: str):
+    """Filter for rows strictly after `after` (value, id) in (sort_column, id_column) `order`."""
+    keyset = tuple_(sort_column, id_column)
+    return keyset < tuple_(*after) if order == "desc" else keyset > tuple_(*after)
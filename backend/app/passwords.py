@@ -0,0 +1,47 @@
+"""bcrypt off the event loop, on a small dedicated pool with an admission limit.
+
+Hashing is deliberately slow, so a burst of logins would otherwise fill the
+shared threadpool that the compute endpoints run on. Calls beyond
+PASSWORD_HASH_MAX_PENDING (running plus queued) are refused with 503.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 16))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+
+
+async def _admit(func, *args):
+    # Only touched from the event loop, so the counter needs no lock
+    global _pending
+    if _pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many logins in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _admit(pwd_context.hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await _admit(pwd_context.verify, password, hashed)
+
+
+def stats():
+    return {"workers": PASSWORD_HASH_WORKERS, "max_pending": PASSWORD_HASH_MAX_PENDING, "pending": _pending}
@@ -0,0 +1,391 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Columns produced for every projected week, in the order the result tables use
+RESULT_COLUMNS = (
+    "week",
+    "beginning_balance",
+    "additional_deposit",
+    "interest",
+    "profit",
+    "tax_deduction",
+    "withdrawal",
+    "ending_balance",
+)
+
+# AnalysisParameter fields that fully determine a projection
+FINANCIAL_FIELDS = (
+    "principal",
+    "interest_week",
+    "projection_period",
+    "tax_rate",
+    "additional_deposit",
+    "deposit_frequency",
+    "regular_withdrawal",
+    "withdrawal_frequency",
+)
+
+# Worker processes for grids too large to evaluate inside the request thread
+PROJECTION_WORKERS = int(os.getenv("PROJECTION_WORKERS", os.cpu_count() or 1))
+# Scenario-weeks below which a request is evaluated inline rather than in the pool
+PARALLEL_THRESHOLD = int(os.getenv("PROJECTION_PARALLEL_THRESHOLD", 1_000_000))
+
+_process_pool = None
+
+
+def process_pool():
+    """Shared process pool, created on first use.
+
+    Uses spawn so workers never inherit the web server's threads or DB connections.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PROJECTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def parallel_map(func, chunks, work):
+    """Apply func to every chunk, in the process pool when `work` (scenario-weeks) is large.
+
+    Small jobs stay in-process; pickling the chunks would cost more than it saves.
+    """
+    if len(chunks) <= 1 or PROJECTION_WORKERS <= 1 or work < PARALLEL_THRESHOLD:
+        return [func(chunk) for chunk in chunks]
+    return list(process_pool().map(func, chunks))
+
+
+def split_work(size, work_per_item):
+    """Index ranges to split `size` items into, one per worker when the job is large."""
+    if size * work_per_item < PARALLEL_THRESHOLD or PROJECTION_WORKERS <= 1:
+        return [(0, size)]
+    bounds = np.linspace(0, size, min(PROJECTION_WORKERS, size) + 1).astype(int)
+    return [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def _column(values, default=0.0):
+    # One row per scenario so parameters broadcast against the week axis
+    return np.array([default if value is None else value for value in values], dtype=float)[:, None]
+
+
+def periodic_amounts(amount, frequency, weeks):
+    """Amount paid on every week that is a multiple of `frequency`, zero elsewhere.
+
+    `amount` and `frequency` are (scenarios, 1) columns; a non-positive frequency
+    means the flow never happens.
+    """
+    active = frequency > 0
+    step = np.where(active, frequency, 1)
+    return np.where(active & (weeks % step == 0), amount, 0.0)
+
+
+def _sequential_balances(principal, growth, net_flows):
+    # Plain recurrence, only used when the scan below cannot be represented in floats
+    ending = np.empty_like(net_flows)
+    growth = np.broadcast_to(growth, net_flows.shape)
+    balance = principal[:, 0]
+    with np.errstate(over="ignore", invalid="ignore"):
+        for week in range(net_flows.shape[1]):
+            balance = balance * growth[:, week] + net_flows[:, week]
+            ending[:, week] = balance
+    return ending
+
+
+def ending_balances(principal, growth, net_flows):
+    """Solve ending_k = ending_{k-1} * growth_k + net_flows[k] for every scenario and week at once.
+
+    `growth` is either one factor per scenario, shape (scenarios, 1), or one per
+    scenario and week. Uses ending_k = G_k * (principal + sum_{j<=k} net_flows[j] / G_j)
+    with G_k the compounded growth up to week k, a single cumulative sum along
+    the week axis.
+    """
+    if net_flows.shape[1] == 0:
+        return net_flows.copy()
+
+    usable = np.where(growth > 0, growth, 1.0)
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        if growth.shape[1] == 1:
+            powers = np.power(usable, np.arange(1, net_flows.shape[1] + 1, dtype=float))
+        else:
+            powers = np.cumprod(usable, axis=1)
+        ending = powers * (principal + np.cumsum(net_flows / powers, axis=1))
+
+    unstable = (growth <= 0).any(axis=1) | ~np.isfinite(ending).all(axis=1)
+    if unstable.any():
+        ending[unstable] = _sequential_balances(principal[unstable], growth[unstable], net_flows[unstable])
+    return ending
+
+
+def project_batch(
+    principal,
+    interest_week,
+    projection_period,
+    tax_rate,
+    additional_deposit,
+    deposit_frequency,
+    regular_withdrawal,
+    withdrawal_frequency,
+):
+    """Project many scenarios together as (scenarios, weeks) arrays.
+
+    Every argument is a sequence with one entry per scenario. The week axis runs
+    to the longest projection_period; a scenario's columns past its own period
+    just continue the projection, so slice them off with scenario_columns().
+    """
+    periods = np.maximum(np.array([int(period or 0) for period in projection_period]), 0)
+    weeks = np.arange(1, periods.max(initial=0) + 1)
+
+    opening = _column(principal)
+    rate = _column(interest_week) / 100
+    tax = _column(tax_rate) / 100
+    deposits = periodic_amounts(_column(additional_deposit), _column(deposit_frequency, 0), weeks)
+    withdrawals = periodic_amounts(_column(regular_withdrawal), _column(withdrawal_frequency, 0), weeks)
+
+    ending = ending_balances(opening, 1 + rate * (1 - tax), deposits - withdrawals)
+    beginning = np.concatenate((opening, ending[:, :-1]), axis=1)[:, : weeks.size]
+
+    with np.errstate(invalid="ignore"):
+        interest = beginning * rate
+        tax_deduction = interest * tax
+    return {
+        "week": np.broadcast_to(weeks, ending.shape),
+        "beginning_balance": beginning,
+        "additional_deposit": deposits,
+        "interest": interest,
+        "profit": interest,
+        "tax_deduction": tax_deduction,
+        "withdrawal": withdrawals,
+        "ending_balance": ending,
+    }
+
+
+def project(
+    principal,
+    interest_week,
+    projection_period,
+    tax_rate=0.0,
+    additional_deposit=0.0,
+    deposit_frequency=1,
+    regular_withdrawal=0.0,
+    withdrawal_frequency=1,
+):
+    """Compute every weekly column of a projection as NumPy arrays.
+
+    Rates are percentages, exactly as stored on AnalysisParameter.
+    Returns a dict keyed by RESULT_COLUMNS.
+    """
+    columns = project_batch(
+        [principal], [interest_week], [projection_period], [tax_rate],
+        [additional_deposit], [deposit_frequency], [regular_withdrawal], [withdrawal_frequency],
+    )
+    return {name: values[0] for name, values in columns.items()}
+
+
+def project_analysis(analysis):
+    """Project an AnalysisCreate payload or an AnalysisParameter row."""
+    return project(
+        principal=analysis.principal,
+        interest_week=analysis.interest_week,
+        projection_period=analysis.projection_period,
+        tax_rate=analysis.tax_rate,
+        additional_deposit=analysis.additional_deposit,
+        deposit_frequency=analysis.deposit_frequency,
+        regular_withdrawal=analysis.regular_withdrawal,
+        withdrawal_frequency=analysis.withdrawal_frequency,
+    )
+
+
+def project_analyses(analyses):
+    """Project a list of AnalysisCreate payloads or AnalysisParameter rows in one call."""
+    return project_batch(
+        [a.principal for a in analyses],
+        [a.interest_week for a in analyses],
+        [a.projection_period for a in analyses],
+        [a.tax_rate for a in analyses],
+        [a.additional_deposit for a in analyses],
+        [a.deposit_frequency for a in analyses],
+        [a.regular_withdrawal for a in analyses],
+        [a.withdrawal_frequency for a in analyses],
+    )
+
+
+def scenario_columns(columns, index, projection_period):
+    """One scenario's columns from project_batch(), trimmed to its own period."""
+    period = max(int(projection_period or 0), 0)
+    return {name: values[index, :period] for name, values in columns.items()}
+
+
+def to_rows(columns, **extra):
+    """Turn projection columns into one plain dict per week.
+
+    Keyword arguments (e.g. analysis_id) are copied onto every row.
+    """
+    names = list(columns)
+    values = [columns[name].tolist() for name in names]
+    return [dict(zip(names, row), **extra) for row in zip(*values)]
+
+
+def _periodic_growth_sum(week, frequency, log_growth):
+    # sum of growth^(week - j) over the paid weeks j = f, 2f, ..., m*f <= week
+    active = frequency > 0
+    step = np.where(active, frequency, 1)
+    paid = np.where(active, week // step, 0)
+    span = paid * step
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        series = np.where(log_growth == 0, paid, np.expm1(span * log_growth) / np.expm1(step * log_growth))
+        return np.exp((week - span) * log_growth) * series
+
+
+def closed_form_balance(
+    week,
+    principal,
+    interest_week,
+    tax_rate=0.0,
+    additional_deposit=0.0,
+    deposit_frequency=1,
+    regular_withdrawal=0.0,
+    withdrawal_frequency=1,
+):
+    """Balance at the end of `week` without iterating over the weeks before it.
+
+    ending_k = growth^k * principal + deposit * S_d(k) - withdrawal * S_w(k), where
+    S(k) is the geometric sum of growth over the weeks the flow is paid. All
+    arguments broadcast, so a whole table of analyses can be evaluated at once.
+    """
+    week, principal, rate, tax, deposit, deposit_freq, withdrawal, withdrawal_freq = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (
+            week, principal, interest_week, tax_rate,
+            additional_deposit, deposit_frequency, regular_withdrawal, withdrawal_frequency,
+        ))
+    )
+    week = np.maximum(np.floor(week), 0)
+    growth = 1 + (rate / 100) * (1 - tax / 100)
+    positive = growth > 0
+
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        log_growth = np.log(np.where(positive, growth, 1.0))
+        balance = np.exp(week * log_growth) * principal
+        for amount, frequency, sign in ((deposit, deposit_freq, 1), (withdrawal, withdrawal_freq, -1)):
+            flow = _periodic_growth_sum(week, frequency, log_growth)
+            balance = balance + np.where(amount != 0, sign * amount * flow, 0.0)
+
+    # A non-positive growth factor has no real logarithm; iterate those few cases
+    balance = np.array(balance)
+    for index in map(tuple, np.argwhere(~positive)):
+        series = project(
+            principal[index], rate[index], int(week[index]), tax[index],
+            deposit[index], deposit_freq[index], withdrawal[index], withdrawal_freq[index],
+        )["ending_balance"]
+        balance[index] = series[-1] if series.size else principal[index]
+
+    return balance if balance.ndim else float(balance)
+
+
+def balance_at(analysis, week=None):
+    """Closed-form balance of an AnalysisParameter row (or AnalysisCreate payload).
+
+    Defaults to the final week of the projection.
+    """
+    return closed_form_balance(
+        analysis.projection_period if week is None else week,
+        analysis.principal,
+        analysis.interest_week,
+        analysis.tax_rate or 0.0,
+        analysis.additional_deposit or 0.0,
+        analysis.deposit_frequency or 0,
+        analysis.regular_withdrawal or 0.0,
+        analysis.withdrawal_frequency or 0,
+    )
+
+
+def final_balances(columns, projection_period, principal):
+    """Ending balance of every scenario in a project_batch() result at its own final week."""
+    periods = np.maximum(np.array([int(period or 0) for period in projection_period]), 0)
+    opening = np.array([value or 0.0 for value in principal], dtype=float)
+    ending = columns["ending_balance"]
+    if ending.shape[1] == 0:
+        return opening
+    last = ending[np.arange(periods.size), np.maximum(periods - 1, 0)]
+    return np.where(periods > 0, last, opening)
+
+
+# AnalysisParameter summary column -> the weekly result column it totals
+SUMMARY_TOTALS = {
+    "total_deposits": "additional_deposit",
+    "total_withdrawals": "withdrawal",
+    "total_tax": "tax_deduction",
+    "total_interest": "interest",
+}
+
+
+def summarize(columns, principal):
+    """Final balance and flow totals of one projection, as stored on AnalysisParameter."""
+    ending = columns["ending_balance"]
+    summary = {name: float(columns[column].sum()) for name, column in SUMMARY_TOTALS.items()}
+    summary["final_balance"] = float(ending[-1]) if ending.size else float(principal or 0.0)
+    return summary
+
+
+def sweep_chunk(params):
+    """Final balances (and optionally ending-balance curves) for one slice of a sweep grid.
+
+    `params` is (columns, include_curves) where columns maps AnalysisParameter field
+    names to equal-length 1-D arrays. Top-level so the process pool can pickle it.
+    """
+    columns, include_curves = params
+    endings = closed_form_balance(
+        columns["projection_period"], columns["principal"], columns["interest_week"],
+        columns["tax_rate"], columns["additional_deposit"], columns["deposit_frequency"],
+        columns["regular_withdrawal"], columns["withdrawal_frequency"],
+    )
+    if not include_curves:
+        return endings, None
+
+    curves = project_batch(
+        columns["principal"], columns["interest_week"], columns["projection_period"],
+        columns["tax_rate"], columns["additional_deposit"], columns["deposit_frequency"],
+        columns["regular_withdrawal"], columns["withdrawal_frequency"],
+    )["ending_balance"]
+    periods = columns["projection_period"].astype(int)
+    return endings, [curves[i, :period].tolist() for i, period in enumerate(periods)]
+
+
+def draw_rates(rng, distribution, shape):
+    """Weekly interest rates (in percent) for a block of Monte Carlo paths.
+
+    `distribution` is a dict with "kind" of normal, t or uniform, plus "mean" and
+    "std" (normal, t), "degrees_of_freedom" (t) or "low" and "high" (uniform).
+    """
+    kind = distribution["kind"]
+    if kind == "normal":
+        return rng.normal(distribution["mean"], distribution["std"], size=shape)
+    if kind == "t":
+        return distribution["mean"] + distribution["std"] * rng.standard_t(distribution["degrees_of_freedom"], size=shape)
+    if kind == "uniform":
+        return rng.uniform(distribution["low"], distribution["high"], size=shape)
+    raise ValueError(f"Unknown rate distribution: {kind}")
+
+
+def simulate_chunk(params):
+    """Ending balances of one block of stochastic-rate paths, shape (paths, weeks).
+
+    `params` is (fields, distribution, paths, seed) where fields holds the
+    AnalysisParameter values and seed is a numpy SeedSequence. Top-level so the
+    process pool can pickle it.
+    """
+    fields, distribution, paths, seed = params
+    weeks = np.arange(1, max(int(fields["projection_period"] or 0), 0) + 1)
+    rng = np.random.default_rng(seed)
+
+    tax = (fields["tax_rate"] or 0.0) / 100
+    growth = 1 + draw_rates(rng, distribution, (paths, weeks.size)) / 100 * (1 - tax)
+    flows = (
+        periodic_amounts(fields["additional_deposit"] or 0.0, fields["deposit_frequency"] or 0, weeks)
+        - periodic_amounts(fields["regular_withdrawal"] or 0.0, fields["withdrawal_frequency"] or 0, weeks)
+    )
+    opening = np.full((paths, 1), float(fields["principal"]))
+    return ending_balances(opening, growth, np.broadcast_to(flows, growth.shape))
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from app.projection import project_analyses, scenario_columns, to_rows
+
+# Total projected weeks kept across all entries (~0.5 KB per cached week of rows)
+PROJECTION_CACHE_MAX_WEEKS = int(os.getenv("PROJECTION_CACHE_MAX_WEEKS", 250_000))
+
+
+def projection_key(analysis):
+    """Canonical hash of the fields that determine a projection.
+
+    Inputs the engine treats identically (None vs 0, unused frequencies) hash
+    the same, so analyses that differ only in description share an entry.
+    """
+    deposit = float(analysis.additional_deposit or 0.0)
+    withdrawal = float(analysis.regular_withdrawal or 0.0)
+    deposit_frequency = int(analysis.deposit_frequency or 0) if deposit else 0
+    withdrawal_frequency = int(analysis.withdrawal_frequency or 0) if withdrawal else 0
+    canonical = [
+        float(analysis.principal),
+        float(analysis.interest_week or 0.0),
+        max(int(analysis.projection_period or 0), 0),
+        float(analysis.tax_rate or 0.0),
+        deposit,
+        max(deposit_frequency, 0),
+        withdrawal,
+        max(withdrawal_frequency, 0),
+    ]
+    return hashlib.sha256(json.dumps(canonical).encode()).hexdigest()
+
+
+class ProjectionCache:
+    """LRU cache of projections keyed by projection_key(), bounded by total weeks.
+
+    Each entry holds the NumPy columns and, once requested, the weekly row dicts,
+    so repeat requests skip both the math and the row building.
+    """
+
+    def __init__(self, max_weeks):
+        self.max_weeks = max_weeks
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._weeks = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _store(self, key, columns):
+        for values in columns.values():
+            values.flags.writeable = False
+        entry = {"columns": columns, "rows": None}
+        size = max(columns["week"].size, 1)
+        if size > self.max_weeks:
+            return entry
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._weeks += size
+            while self._weeks > self.max_weeks:
+                _, evicted = self._entries.popitem(last=False)
+                self._weeks -= max(evicted["columns"]["week"].size, 1)
+                self.evictions += 1
+        return entry
+
+    def entries(self, analyses):
+        """Cache entries for a list of analyses; misses are projected in one batch."""
+        keys = [projection_key(analysis) for analysis in analyses]
+        found = [self._lookup(key) for key in keys]
+
+        missing = [i for i, entry in enumerate(found) if entry is None]
+        if missing:
+            columns = project_analyses([analyses[i] for i in missing])
+            for position, i in enumerate(missing):
+                weekly = scenario_columns(columns, position, analyses[i].projection_period)
+                found[i] = self._store(keys[i], {name: values.copy() for name, values in weekly.items()})
+        return found
+
+    def columns(self, analysis):
+        return self.entries([analysis])[0]["columns"]
+
+    def rows(self, analysis, **extra):
+        """Weekly row dicts for one analysis, with `extra` (e.g. analysis_id) added to each."""
+        return self.rows_many([analysis], [extra])[0]
+
+    def rows_many(self, analyses, extras):
+        result = []
+        for entry, extra in zip(self.entries(analyses), extras):
+            if entry["rows"] is None:
+                entry["rows"] = to_rows(entry["columns"])
+            result.append([dict(row, **extra) for row in entry["rows"]])
+        return result
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "weeks": self._weeks,
+                "max_weeks": self.max_weeks,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._weeks = 0
+
+
+projection_cache = ProjectionCache(PROJECTION_CACHE_MAX_WEEKS)
@@ -0,0 +1,69 @@
+import os
+from datetime import datetime
+import pytz
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.projection import FINANCIAL_FIELDS, summarize
+from app.projection_cache import projection_cache
+
+# When on, result tables hold one parameter snapshot per analysis instead of one row per week.
+# Readers only look at the storage of the current mode, so before flipping the flag run
+# `python -m scripts.convert_results --to virtual|materialized` for the new mode.
+VIRTUAL_RESULTS = os.getenv("VIRTUAL_RESULTS", "false").lower() in ("1", "true", "yes")
+
+STAGING = "staging"
+PERMANENT = "permanent"
+
+async def get_snapshot(db: AsyncSession, analysis_id: int, kind: str):
+    result = await db.execute(
+        select(models.ResultSnapshot)
+        .where(models.ResultSnapshot.analysis_id == analysis_id, models.ResultSnapshot.kind == kind)
+    )
+    return result.scalars().first()
+
+
+async def delete_snapshot(db: AsyncSession, analysis_id: int, kind: str):
+    result = await db.execute(
+        delete(models.ResultSnapshot)
+        .where(models.ResultSnapshot.analysis_id == analysis_id, models.ResultSnapshot.kind == kind)
+    )
+    return result.rowcount
+
+
+async def save_summary(db: AsyncSession, analysis_id: int, columns, principal):
+    """Store the summary of a computed projection on its AnalysisParameter row. The caller commits."""
+    await db.execute(
+        update(models.AnalysisParameter)
+        .where(models.AnalysisParameter.id == analysis_id)
+        .values(**summarize(columns, principal), computed_at=func.now())
+    )
+
+
+async def save_snapshot(db: AsyncSession, analysis_id: int, source, kind: str):
+    """Replace the analysis' snapshot of `kind` with the financial fields of `source`.
+
+    `source` can be an AnalysisCreate, an AnalysisParameter or another snapshot.
+    The caller commits.
+    """
+    await delete_snapshot(db, analysis_id, kind)
+    snapshot = models.ResultSnapshot(
+        analysis_id=analysis_id,
+        kind=kind,
+        generated_at=datetime.now(pytz.UTC),
+        **{field: getattr(source, field) for field in FINANCIAL_FIELDS},
+    )
+    db.add(snapshot)
+    return snapshot
+
+
+def snapshot_rows(snapshots):
+    """Weekly result rows for a list of snapshots, shaped like AnalysisResultSchema.
+
+    Generated rows have no database id, so `id` is the week number.
+    """
+    extras = [{"analysis_id": s.analysis_id, "generated_at": s.generated_at} for s in snapshots]
+    rows = [row for weekly in projection_cache.rows_many(snapshots, extras) for row in weekly]
+    for row in rows:
+        row["id"] = row["week"]
+    return rows
@@ -1,25 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app import models, schemas
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from collections import defaultdict
+from sqlalchemy import ARRAY, Integer, any_, bindparam, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.database import get_async_db
+from app import jobs, models, schemas
 from typing import List
 import logging
 from pydantic import BaseModel
-from app.utils.auth_utils import get_current_user
 from app.models import User
 from app.schemas import UserOut
 from app.schemas import AnalysisCreate
+from app.bulk_load import write_columns_async
+from app.projection import SUMMARY_TOTALS, balance_at
+from app.projection_cache import projection_cache
+from app.results import VIRTUAL_RESULTS, PERMANENT, STAGING, delete_snapshot, get_snapshot, save_snapshot, save_summary, snapshot_rows
 from ..oauth import get_current_user
-from datetime import datetime
-import pytz
 from fastapi import Query
 from typing import Optional
 
 # ✅ Define Router
 router = APIRouter()
 
-# ✅ Setup Logging
-logging.basicConfig(level=logging.INFO)
+# ✅ Columns shared by staging_results and analysis_results, copied on promotion
+RESULT_COPY_COLUMNS = (
+    "analysis_id", "week", "beginning_balance", "additional_deposit", "interest",
+    "profit", "withdrawal", "tax_deduction", "ending_balance",
+)
+
+# ✅ Setup Logging (configured once in app.logging_config)
 logger = logging.getLogger(__name__)
 
 # ✅ UPDATE Analysis Parameters (Editable fields)
@@ -34,34 +44,46 @@ class UpdateAnalysisParams(BaseModel):
     regular_withdrawal: float
     withdrawal_frequency: int
 
-# ✅ CREATE Analysis with user ID
+# ✅ CREATE Analysis with user ID (background=true queues the staging computation and returns a job id)
 @router.post("/analysis/")
-def create_analysis(data: AnalysisCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_analysis(
+    data: AnalysisCreate,
+    response: Response,
+    background: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
     try:
-        logger.info(f"Creating analysis for: {data.description} by user {current_user.id}")
-        print(f"Creating analysis for: {data.description}")
+        logger.debug(f"Creating analysis for: {data.description} by user {current_user.id}")
 
         db_analysis = models.AnalysisParameter(**data.dict(), user_id=current_user.id)
         db.add(db_analysis)
-        db.commit()
-        db.refresh(db_analysis)
+        await db.commit()
+
+        if background:
+            job = await jobs.enqueue(db, db_analysis.id)
+            response.status_code = 202
+            logger.info(f"✅ Analysis Created with ID: {db_analysis.id}, staging queued as job {job.id}")
+            return {"id": db_analysis.id, "job_id": job.id, "message": "Analysis created, results are being computed"}
 
-        print(f"✅ Analysis Created with ID: {db_analysis.id}")
-        print("Calling save_analysis_results_to_staging now...")
-        save_analysis_results_to_staging(db, db_analysis.id, data)
-        print("✅ Finished calling save_analysis_results_to_staging")
+        await save_analysis_results_to_staging(db, db_analysis.id, data)
 
         logger.info(f"✅ Analysis Created with ID: {db_analysis.id}")
         return {"id": db_analysis.id, "message": "Analysis successfully created"}
 
     except Exception as e:
-        logger.error(f"🚨 Error creating analysis: {str(e)}")
-        print(f"🚨 Error creating analysis: {str(e)}")
+        logger.exception(f"🚨 Error creating analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/update-analysis/{analysis_id}")
-async def update_analysis(analysis_id: int, params: UpdateAnalysisParams, db: Session = Depends(get_db)):
-    analysis = db.query(models.AnalysisParameter).filter(models.AnalysisParameter.id == analysis_id).first()
+async def update_analysis(
+    analysis_id: int,
+    params: UpdateAnalysisParams,
+    response: Response,
+    background: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+):
+    analysis = await db.get(models.AnalysisParameter, analysis_id)
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
 
@@ -75,8 +97,8 @@ async def update_analysis(analysis_id: int, params: UpdateAnalysisParams, db: Se
     analysis.regular_withdrawal = params.regular_withdrawal
     analysis.withdrawal_frequency = params.withdrawal_frequency
 
-    db.commit()
-    db.refresh(analysis)
+    await db.commit()
+    await db.refresh(analysis)
 
     updated_data = AnalysisCreate(
         description=analysis.description,
@@ -90,7 +112,12 @@ async def update_analysis(analysis_id: int, params: UpdateAnalysisParams, db: Se
         withdrawal_frequency=analysis.withdrawal_frequency,
     )
 
-    save_analysis_results_to_staging(db, analysis_id, updated_data)
+    job = None
+    if background:
+        job = await jobs.enqueue(db, analysis_id)
+        response.status_code = 202
+    else:
+        await save_analysis_results_to_staging(db, analysis_id, updated_data)
     logger.info(f"✅ Analysis {analysis_id} updated successfully")
 
     return {
@@ -104,190 +131,266 @@ async def update_analysis(analysis_id: int, params: UpdateAnalysisParams, db: Se
         "deposit_frequency": analysis.deposit_frequency,
         "regular_withdrawal": analysis.regular_withdrawal,
         "withdrawal_frequency": analysis.withdrawal_frequency,
-        "user_id": analysis.user_id
+        "user_id": analysis.user_id,
+        "job_id": job.id if job else None,
     }
 
 @router.get("/analysis/{analysis_id}", response_model=schemas.AnalysisOut)
-def get_analysis_by_id(analysis_id: int, db: Session = Depends(get_db)):
-    analysis = db.query(models.AnalysisParameter).filter(models.AnalysisParameter.id == analysis_id).first()
+async def get_analysis_by_id(analysis_id: int, db: AsyncSession = Depends(get_async_db)):
+    analysis = await db.get(models.AnalysisParameter, analysis_id, options=[selectinload(models.AnalysisParameter.user)])
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
     return analysis
 
 @router.get("/results/{analysis_id}", response_model=List[schemas.AnalysisResultSchema])
-def get_results(analysis_id: int, db: Session = Depends(get_db)):
-    results = db.query(models.StagingResult).filter(models.StagingResult.analysis_id == analysis_id).all()
+async def get_results(analysis_id: int, db: AsyncSession = Depends(get_async_db)):
+    if VIRTUAL_RESULTS:
+        snapshot = await get_snapshot(db, analysis_id, STAGING)
+        results = await run_in_threadpool(snapshot_rows, [snapshot]) if snapshot else []
+    else:
+        results = (await db.execute(
+            select(models.StagingResult).where(models.StagingResult.analysis_id == analysis_id)
+        )).scalars().all()
     if not results:
         logger.warning(f"No results found in STAGING TABLE for analysis ID {analysis_id}")
         raise HTTPException(status_code=404, detail="No results found for this analysis in staging table")
     return results
 
 @router.get("/permanent-results/{analysis_id}", response_model=List[schemas.AnalysisResultSchema])
-def get_permanent_results(analysis_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    analysis = db.query(models.AnalysisParameter).filter(models.AnalysisParameter.id == analysis_id).first()
+async def get_permanent_results(analysis_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    analysis = await db.get(models.AnalysisParameter, analysis_id)
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
 
     if not current_user.is_manager and analysis.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this analysis")
 
-    results = db.query(models.AnalysisResult).filter(models.AnalysisResult.analysis_id == analysis_id).all()
+    if VIRTUAL_RESULTS:
+        snapshot = await get_snapshot(db, analysis_id, PERMANENT)
+        results = await run_in_threadpool(snapshot_rows, [snapshot]) if snapshot else []
+    else:
+        results = (await db.execute(
+            select(models.AnalysisResult).where(models.AnalysisResult.analysis_id == analysis_id)
+        )).scalars().all()
     if not results:
         raise HTTPException(status_code=404, detail="No saved results found for this analysis")
     return results
 
+def analysis_id_in(column, ids, dialect: str):
+    """`column = ANY(:ids)` with one array parameter on Postgres, a plain IN elsewhere."""
+    if dialect == "postgresql":
+        return column == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+    return column.in_(ids)
+
+# ✅ Parameters, latest ending balance and (optionally) weekly results of many analyses in one round trip.
+# Ids that do not exist or belong to another user are listed in `missing`.
+@router.get("/analyses/batch", response_model=schemas.AnalysisBatchOut)
+async def get_analyses_batch(
+    ids: List[int] = Query(..., min_length=1, max_length=500),
+    include_weekly: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    ids = list(dict.fromkeys(ids))
+    dialect = db.bind.dialect.name
+
+    query = (
+        select(models.AnalysisParameter)
+        .options(selectinload(models.AnalysisParameter.user))
+        .where(analysis_id_in(models.AnalysisParameter.id, ids, dialect))
+    )
+    if not current_user.is_manager:
+        query = query.where(models.AnalysisParameter.user_id == current_user.id)
+    analyses = (await db.execute(query)).scalars().all()
+    found = {analysis.id for analysis in analyses}
+
+    ending_balances, weekly = {}, defaultdict(list)
+    if found and VIRTUAL_RESULTS:
+        # The permanent snapshot holds the saved parameters; balances come from the closed form
+        snapshots = (await db.execute(
+            select(models.ResultSnapshot).where(
+                models.ResultSnapshot.kind == PERMANENT,
+                analysis_id_in(models.ResultSnapshot.analysis_id, list(found), dialect),
+            )
+        )).scalars().all()
+        ending_balances = {snapshot.analysis_id: balance_at(snapshot) for snapshot in snapshots}
+        if include_weekly:
+            for row in await run_in_threadpool(snapshot_rows, snapshots):
+                weekly[row["analysis_id"]].append(row)
+    elif found:
+        Result = models.AnalysisResult
+        if dialect == "postgresql":
+            latest = (
+                select(Result.analysis_id, Result.ending_balance)
+                .where(analysis_id_in(Result.analysis_id, list(found), dialect))
+                .distinct(Result.analysis_id)
+                .order_by(Result.analysis_id, Result.week.desc())
+            )
+        else:
+            rank = func.row_number().over(partition_by=Result.analysis_id, order_by=Result.week.desc()).label("rank")
+            ranked = (
+                select(Result.analysis_id, Result.ending_balance, rank)
+                .where(analysis_id_in(Result.analysis_id, list(found), dialect))
+                .subquery()
+            )
+            latest = select(ranked.c.analysis_id, ranked.c.ending_balance).where(ranked.c.rank == 1)
+        ending_balances = dict((await db.execute(latest)).all())
+        if include_weekly:
+            rows = (await db.execute(
+                select(Result)
+                .where(analysis_id_in(Result.analysis_id, list(found), dialect))
+                .order_by(Result.analysis_id, Result.week)
+            )).scalars().all()
+            for row in rows:
+                weekly[row.analysis_id].append(row)
+
+    order = {analysis_id: position for position, analysis_id in enumerate(ids)}
+    items = [
+        schemas.AnalysisBatchItem.model_validate({
+            **schemas.AnalysisOut.model_validate(analysis, from_attributes=True).model_dump(),
+            "ending_balance": ending_balances.get(analysis.id),
+            "results": weekly.get(analysis.id, []) if include_weekly else None,
+        }, from_attributes=True)
+        for analysis in sorted(analyses, key=lambda analysis: order[analysis.id])
+    ]
+    return {"items": items, "missing": [analysis_id for analysis_id in ids if analysis_id not in found]}
+
 @router.get("/saved-analysis", response_model=List[schemas.AnalysisOut])
-def get_saved_analyses(
+async def get_saved_analyses(
     username: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
+    query = select(models.AnalysisParameter).options(selectinload(models.AnalysisParameter.user))
     if current_user.is_manager:
         if username:
-            user = db.query(User).filter(User.username == username).first()
+            user = (await db.execute(select(User).where(User.username == username))).scalars().first()
             if not user:
                 raise HTTPException(status_code=404, detail="User not found")
-            return db.query(models.AnalysisParameter).filter(models.AnalysisParameter.user_id == user.id).all()
-        return db.query(models.AnalysisParameter).all()
-
-    return db.query(models.AnalysisParameter).filter(models.AnalysisParameter.user_id == current_user.id).all()
+            query = query.where(models.AnalysisParameter.user_id == user.id)
+        return (await db.execute(query)).scalars().all()
+
+    return (await db.execute(query.where(models.AnalysisParameter.user_id == current_user.id))).scalars().all()
+
+# ✅ Poll a background staging job
+@router.get("/jobs/{job_id}", response_model=schemas.ProjectionJobOut)
+async def get_job_status(job_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    """Status of a staging job. progress is coarse: 0 while queued or computing, 0.5 once
+    the projection is computed and being saved, 1.0 when done."""
+    job = await db.get(models.ProjectionJob, job_id, options=[selectinload(models.ProjectionJob.analysis)])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not current_user.is_manager and job.analysis.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this job")
+    return job
 
 @router.post("/move-to-permanent/{analysis_id}")
-def move_to_permanent(analysis_id: int, db: Session = Depends(get_db)):
+async def move_to_permanent(analysis_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        # ✅ 1. Fetch staging results
-        staging_results = db.query(models.StagingResult).filter(models.StagingResult.analysis_id == analysis_id).all()
-        if not staging_results:
+        if VIRTUAL_RESULTS:
+            # ✅ Virtual results: promote the parameter snapshot, no weekly rows to copy
+            staging = await get_snapshot(db, analysis_id, STAGING)
+            if not staging:
+                raise HTTPException(status_code=404, detail="No staging data found")
+
+            await db.execute(delete(models.AnalysisResult).where(models.AnalysisResult.analysis_id == analysis_id))
+            await db.execute(delete(models.PermanentResult).where(models.PermanentResult.analysis_id == analysis_id))
+            await save_snapshot(db, analysis_id, staging, PERMANENT)
+            await save_summary(db, analysis_id, await run_in_threadpool(projection_cache.columns, staging), staging.principal)
+            await delete_snapshot(db, analysis_id, STAGING)
+            await db.commit()
+
+            logger.info(f"✅ Analysis {analysis_id} snapshot moved to permanent")
+            return {"message": "Data successfully moved to permanent tables"}
+
+        # ✅ One transaction, row data never leaves the database
+        staging = models.StagingResult
+        from_staging = staging.analysis_id == analysis_id
+        await db.execute(delete(models.AnalysisResult).where(models.AnalysisResult.analysis_id == analysis_id))
+        await db.execute(delete(models.PermanentResult).where(models.PermanentResult.analysis_id == analysis_id))
+
+        # ✅ Analysis results get a fresh promotion timestamp
+        promoted = (await db.execute(
+            insert(models.AnalysisResult).from_select(
+                [*RESULT_COPY_COLUMNS, "generated_at"],
+                select(*(staging.__table__.c[name] for name in RESULT_COPY_COLUMNS), func.now()).where(from_staging),
+            )
+        )).rowcount
+        if not promoted:
             raise HTTPException(status_code=404, detail="No staging data found")
 
-        # ✅ 2. Delete old permanent analysis results
-        db.query(models.AnalysisResult).filter(models.AnalysisResult.analysis_id == analysis_id).delete()
-        db.commit()
-
-        # ✅ 3. Delete old permanent weekly breakdowns
-        db.query(models.PermanentResult).filter(models.PermanentResult.analysis_id == analysis_id).delete()
-        db.commit()
-
-        # ✅ 4. Move analysis-level final result
-        permanent_results = []
-        for result in staging_results:
-            permanent = models.AnalysisResult(
-                analysis_id=result.analysis_id,
-                week=result.week,
-                beginning_balance=result.beginning_balance,
-                additional_deposit=result.additional_deposit,
-                interest=result.interest,
-                profit=result.profit,
-                withdrawal=result.withdrawal,
-                tax_deduction=result.tax_deduction,
-                ending_balance=result.ending_balance,
-                generated_at=datetime.now(pytz.UTC)
+        # ✅ Weekly breakdown keeps the staging timestamp (permanent_results has no interest column)
+        weekly_columns = [name for name in RESULT_COPY_COLUMNS if name != "interest"] + ["generated_at"]
+        await db.execute(
+            insert(models.PermanentResult).from_select(
+                weekly_columns, select(*(staging.__table__.c[name] for name in weekly_columns)).where(from_staging)
             )
-            permanent_results.append(permanent)
-
-        db.bulk_save_objects(permanent_results)
-        db.commit()
-
-        # ✅ 5. Move weekly breakdown to permanent_results
-        permanent_weekly = []
-        for sr in staging_results:
-            permanent_row = models.PermanentResult(
-                analysis_id=sr.analysis_id,
-                week=sr.week,
-                beginning_balance=sr.beginning_balance,
-                additional_deposit=sr.additional_deposit,
-                profit=sr.profit,
-                withdrawal=sr.withdrawal,
-                tax_deduction=sr.tax_deduction,
-                ending_balance=sr.ending_balance,
-                generated_at=sr.generated_at,
+        )
+
+        # ✅ Summary columns are totalled from the promoted rows, in the same transaction
+        await db.execute(
+            update(models.AnalysisParameter)
+            .where(models.AnalysisParameter.id == analysis_id)
+            .values(
+                final_balance=select(staging.ending_balance).where(from_staging)
+                .order_by(staging.week.desc()).limit(1).scalar_subquery(),
+                computed_at=select(func.max(staging.generated_at)).where(from_staging).scalar_subquery(),
+                **{
+                    name: select(func.sum(staging.__table__.c[column])).where(from_staging).scalar_subquery()
+                    for name, column in SUMMARY_TOTALS.items()
+                },
             )
-            permanent_weekly.append(permanent_row)
+        )
 
-        db.bulk_save_objects(permanent_weekly)
-        db.commit()
-
-        # ✅ 6. Clean up staging table
-        db.query(models.StagingResult).filter(models.StagingResult.analysis_id == analysis_id).delete()
-        db.commit()
+        # ✅ Clear staging; a row count mismatch means staging changed underneath us
+        cleared = (await db.execute(delete(staging).where(from_staging).returning(staging.id))).fetchall()
+        if len(cleared) != promoted:
+            raise RuntimeError(f"staging rows changed during promotion ({promoted} copied, {len(cleared)} cleared)")
+        await db.commit()
 
         logger.info(f"✅ Analysis {analysis_id} moved to permanent table (including weekly results)")
         return {"message": "Data successfully moved to permanent tables"}
 
     except Exception as e:
-        db.rollback()
-        logger.error(f"🚨 Failed to move data: {str(e)}")
+        await db.rollback()
+        logger.exception(f"🚨 Failed to move data: {str(e)}")
         return {"error": f"Failed to move data: {str(e)}"}
 
 
 
-def save_analysis_results_to_staging(db: Session, analysis_id: int, analysis: schemas.AnalysisCreate):
+async def save_analysis_results_to_staging(db: AsyncSession, analysis_id: int, analysis: schemas.AnalysisCreate, on_computed=None):
     try:
-        print(f"🚀 Saving results to STAGING TABLE for analysis ID: {analysis_id}")
-        logger.info(f"Saving results to STAGING TABLE for analysis ID: {analysis_id}")
-
-        deleted_rows = db.query(models.StagingResult).filter(models.StagingResult.analysis_id == analysis_id).delete()
-        print(f"🧹 Cleared {deleted_rows} old records from STAGING TABLE")
-        logger.info(f"🧹 Cleared {deleted_rows} old records from STAGING TABLE")
-
-        beginning_balance = analysis.principal
-        results = []
-
-        for week in range(1, analysis.projection_period + 1):
-            print(f"DEBUG: Generating week {week}, balance: {beginning_balance}")
-
-            interest = beginning_balance * (analysis.interest_week / 100)
-            profit = interest
-            tax_deduction = profit * (analysis.tax_rate / 100)
-            additional_deposit = analysis.additional_deposit if week % analysis.deposit_frequency == 0 else 0
-            withdrawal = analysis.regular_withdrawal if week % analysis.withdrawal_frequency == 0 else 0
-            ending_balance = beginning_balance + additional_deposit + profit - withdrawal - tax_deduction
-
-            print(f"Week {week}: Beginning: {beginning_balance}, Deposit: {additional_deposit}, Interest: {interest}, Withdrawal: {withdrawal}, Ending: {ending_balance}")
-
-            new_result = models.StagingResult(
-                analysis_id=analysis_id,
-                week=week,
-                beginning_balance=beginning_balance,
-                additional_deposit=additional_deposit,
-                interest=interest,
-                profit=profit,
-                withdrawal=withdrawal,
-                tax_deduction=tax_deduction,
-                ending_balance=ending_balance
-            )
+        logger.debug(f"🚀 Saving results to STAGING TABLE for analysis ID: {analysis_id}")
 
-            results.append(new_result)
-            beginning_balance = ending_balance
+        # ✅ Projection is CPU-bound, keep it off the event loop (and compute before taking any row locks)
+        columns = await run_in_threadpool(projection_cache.columns, analysis)
+        if on_computed:
+            await on_computed()
 
-        print(f"✅ Attempting to save {len(results)} results to staging_results...")
-        db.bulk_save_objects(results)
-        db.flush()
-        db.commit()
+        deleted_rows = (await db.execute(
+            delete(models.StagingResult).where(models.StagingResult.analysis_id == analysis_id)
+        )).rowcount
+        logger.debug(f"🧹 Cleared {deleted_rows} old records from STAGING TABLE")
 
-        staging_data = db.query(models.StagingResult).filter(models.StagingResult.analysis_id == analysis_id).all()
-        print(f"DEBUG: Retrieved {len(staging_data)} records from STAGING TABLE")
-        logger.info(f"✅ Successfully saved {len(results)} results to STAGING TABLE for analysis ID {analysis_id}")
+        if VIRTUAL_RESULTS:
+            # ✅ Only the parameters are stored; weeks are generated on read
+            await save_snapshot(db, analysis_id, analysis, STAGING)
+            await db.commit()
+            logger.debug(f"✅ Saved STAGING snapshot for analysis ID {analysis_id}")
+            return
 
-    except Exception as e:
-        db.rollback()
-        logger.error(f"🚨 Error saving to STAGING TABLE: {str(e)}")
-        print(f"🚨 Error saving to STAGING TABLE: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error saving to Staging Table")
+        saved = await write_columns_async(db, models.StagingResult, columns, analysis_id=analysis_id)
+        await db.commit()
 
-@router.get("/manager/all-analyses", response_model=List[schemas.AnalysisWithUserOut])
-def get_all_analyses_for_manager(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
-    if not current_user.is_manager:
-        raise HTTPException(status_code=403, detail="Access denied")
+        logger.debug(f"✅ Successfully saved {saved} results to STAGING TABLE for analysis ID {analysis_id}")
 
-    analyses = db.query(models.AnalysisParameter).all()
-    return analyses
+    except Exception as e:
+        await db.rollback()
+        logger.exception(f"🚨 Error saving to STAGING TABLE: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error saving to Staging Table")
 
 @router.get("/users", response_model=List[UserOut])
-def get_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_users(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     if not current_user.is_manager:
         raise HTTPException(status_code=403, detail="Unauthorized")
-    return db.query(User).all()
+    return (await db.execute(select(User))).scalars().all()
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import AnalysisParameter, AnalysisResult, User
-from typing import List
+from collections import defaultdict
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from app.database import get_async_db
+from app.models import AnalysisParameter, AnalysisResult, ResultSnapshot, User
+from app.pagination import decode_cursor, encode_cursor, keyset_after
+from typing import List, Optional
 from datetime import datetime
 from app.oauth import get_current_manager
+from app.results import VIRTUAL_RESULTS, PERMANENT, snapshot_rows
 import pytz
 
 # ✅ Correct Router Setup
@@ -13,16 +19,34 @@ router = APIRouter(
     tags=["Manager Reports"]
 )
 
+WEEKLY_COLUMNS = (
+    "week",
+    "beginning_balance",
+    "additional_deposit",
+    "profit",
+    "withdrawal",
+    "tax_deduction",
+    "ending_balance",
+    "generated_at",
+)
+
+# ✅ Two queries per page: analyses with their users, then every weekly row of the page grouped in memory.
+# limit/cursor page by (created_at, id); X-Next-Cursor carries the next page. include_weekly=false skips the rows.
 @router.get("/reports")
-def get_grouped_reports(
+async def get_grouped_reports(
+    response: Response,
     username: str = Query(None),
     start_date: str = Query(None),
     end_date: str = Query(None),
-    db: Session = Depends(get_db),
+    include_weekly: bool = Query(True),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_manager)  # ✅ Manager only access
 ):
     try:
-        query = db.query(AnalysisParameter).join(AnalysisParameter.user)
+        # Outer join: analyses whose user is gone are still reported, under "-"
+        query = select(AnalysisParameter).outerjoin(AnalysisParameter.user).options(contains_eager(AnalysisParameter.user))
 
         if username:
             query = query.filter(User.username.ilike(f"%{username}%"))
@@ -30,41 +54,59 @@ def get_grouped_reports(
             query = query.filter(AnalysisParameter.created_at >= datetime.strptime(start_date, "%Y-%m-%d"))
         if end_date:
             query = query.filter(AnalysisParameter.created_at <= datetime.strptime(end_date, "%Y-%m-%d"))
+        if cursor:
+            after = decode_cursor(cursor, "created_at")
+            query = query.filter(keyset_after(AnalysisParameter.created_at, AnalysisParameter.id, after, "desc"))
+
+        query = query.order_by(AnalysisParameter.created_at.desc(), AnalysisParameter.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        analyses = (await db.execute(query)).scalars().all()
+
+        if limit is not None and len(analyses) == limit:
+            last = analyses[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor("created_at", last.created_at, last.id)
 
-        analyses = query.order_by(AnalysisParameter.created_at.desc()).all()
+        # ✅ Fetch the final (permanent) results of the whole page at once
+        weekly = defaultdict(list)
+        ids = [analysis.id for analysis in analyses]
+        if include_weekly and ids:
+            if VIRTUAL_RESULTS:
+                snapshots = (await db.execute(
+                    select(ResultSnapshot).where(ResultSnapshot.analysis_id.in_(ids), ResultSnapshot.kind == PERMANENT)
+                )).scalars().all()
+                final_results = await run_in_threadpool(snapshot_rows, snapshots)
+            else:
+                final_results = (await db.execute(
+                    select(AnalysisResult.analysis_id, *(AnalysisResult.__table__.c[column] for column in WEEKLY_COLUMNS))
+                    .where(AnalysisResult.analysis_id.in_(ids))
+                    .order_by(AnalysisResult.analysis_id, AnalysisResult.week)
+                )).mappings().all()
+
+            for r in final_results:
+                weekly[r["analysis_id"]].append({
+                    **{column: r[column] for column in WEEKLY_COLUMNS},
+                    "generated_at": r["generated_at"].isoformat() if r["generated_at"] else None
+                })
 
         results = []
 
         for analysis in analyses:
-            # ✅ Fetch the final (permanent) results for this analysis
-            final_results = db.query(AnalysisResult).filter(
-                AnalysisResult.analysis_id == analysis.id
-            ).order_by(AnalysisResult.week).all()
-
-            results.append({
+            report = {
                 "id": analysis.id,
                 "username": analysis.user.username if analysis.user else "-",
                 "description": analysis.description,
                 "principal": analysis.principal,
-                "ending_balance": analysis.final_result.ending_balance if hasattr(analysis, 'final_result') and analysis.final_result else None,
+                "ending_balance": analysis.final_balance,
                 "created_at": analysis.created_at.astimezone(pytz.UTC).isoformat() if analysis.created_at else None,
-
-                "weekly_breakdown": [
-                    {
-                        "week": r.week,
-                        "beginning_balance": r.beginning_balance,
-                        "additional_deposit": r.additional_deposit,
-                        "profit": r.profit,
-                        "withdrawal": r.withdrawal,
-                        "tax_deduction": r.tax_deduction,
-                        "ending_balance": r.ending_balance,
-                        "generated_at": r.generated_at.isoformat() if r.generated_at else None
-                    }
-                    for r in final_results
-                ]
-            })
+            }
+            if include_weekly:
+                report["weekly_breakdown"] = weekly[analysis.id]
+            results.append(report)
 
         return results
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,19 +1,33 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal, get_async_db
+from app.models import RefreshToken, User
+from app.oauth import ALGORITHM, SECRET_KEY
+from app.passwords import hash_password, verify_password
 from pydantic import BaseModel
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jose import jwt
+import asyncio
+import hashlib
+import logging
 import os
-from datetime import datetime, timedelta
+import secrets
+from datetime import datetime, timedelta, timezone
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
 
-SECRET_KEY = os.getenv("JWT_SECRET_KEY", "mysecret")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# Short-lived access tokens; clients renew them with the refresh token instead of logging in again
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+# A token rotated this recently is a second tab or a retry racing the rotation, not a stolen token
+REFRESH_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_REUSE_GRACE_SECONDS", 60))
+REFRESH_TOKEN_CLEANUP_SECONDS = int(os.getenv("REFRESH_TOKEN_CLEANUP_SECONDS", 3600))
+
+# RefreshToken.revoked_reason values
+ROTATED = "rotated"
+LOGOUT = "logout"
+REUSE = "reuse"
 
 class UserCreate(BaseModel):
     username: str
@@ -25,42 +39,143 @@ class UserLogin(BaseModel):
     email: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 def create_access_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def hash_refresh_token(token: str) -> str:
+    # Refresh tokens are 256 random bits, so a plain SHA-256 is enough to store them
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def issue_tokens(db: AsyncSession, user: User):
+    """New access token plus a new refresh token for `user`. The caller commits."""
+    refresh_token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user.id,
+        token_hash=hash_refresh_token(refresh_token),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+
+    # ✅ ADD username to JWT
+    access_token = create_access_token(
+        data={
+            "sub": user.email,
+            "user_id": user.id,
+            "is_manager": user.is_manager,
+            "username": user.username     # ✅ Ensure this is here!
+        },
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        "refresh_token": refresh_token,
+    }
+
 @router.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == user.email).first():
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if (await db.execute(select(User).where(User.email == user.email))).scalars().first():
         raise HTTPException(status_code=400, detail="Email already registered")
-    
-    hashed_pw = pwd_context.hash(user.password)
+
+    hashed_pw = await hash_password(user.password)
     db_user = User(username=user.username, email=user.email, hashed_password=hashed_pw, is_manager=user.is_manager)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     return {"message": "User registered successfully"}
 
 @router.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
-    
-    if not db_user or not pwd_context.verify(user.password, db_user.hashed_password):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = (await db.execute(select(User).where(User.email == user.email))).scalars().first()
+
+    if not db_user or not await verify_password(user.password, db_user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    print("✅ Fetched User from DB:", db_user.username)
 
-    # ✅ ADD username to JWT
-    access_token = create_access_token(
-        data={
-            "sub": db_user.email,
-            "user_id": db_user.id,
-            "is_manager": db_user.is_manager,
-            "username": db_user.username     # ✅ Ensure this is here!
-        },
-        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    logger.debug("✅ Login", extra={"user_id": db_user.id})
+
+    tokens = await issue_tokens(db, db_user)
+    await db.commit()
+    return tokens
+
+# ✅ Trade a refresh token for a new pair; no password, no bcrypt.
+# Each refresh token works once. Presenting one that was rotated more than
+# REFRESH_REUSE_GRACE_SECONDS ago revokes every session of that user.
+@router.post("/refresh")
+async def refresh(body: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    token_hash = hash_refresh_token(body.refresh_token)
+    now = datetime.now(timezone.utc)
+
+    # Claim the token atomically so two concurrent refreshes cannot both rotate it
+    user_id = (await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == token_hash, RefreshToken.revoked_at.is_(None), RefreshToken.expires_at > now)
+        .values(revoked_at=now, revoked_reason=ROTATED)
+        .returning(RefreshToken.user_id)
+    )).scalar()
+
+    if user_id is None:
+        # Logged-out tokens and rotations inside the grace window just fail
+        reused = (await db.execute(
+            select(RefreshToken.user_id).where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.revoked_reason == ROTATED,
+                RefreshToken.revoked_at < now - timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS),
+            )
+        )).scalar()
+        if reused is not None:
+            await db.execute(
+                update(RefreshToken)
+                .where(RefreshToken.user_id == reused, RefreshToken.revoked_at.is_(None))
+                .values(revoked_at=now, revoked_reason=REUSE)
+            )
+            await db.commit()
+            logger.warning("Rotated refresh token reused, revoked all sessions", extra={"user_id": reused})
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    db_user = await db.get(User, user_id)
+    if db_user is None:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    tokens = await issue_tokens(db, db_user)
+    await db.commit()
+    return tokens
+
+@router.post("/logout")
+async def logout(body: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == hash_refresh_token(body.refresh_token), RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc), revoked_reason=LOGOUT)
     )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    await db.commit()
+    return {"message": "Logged out"}
+
+async def prune_refresh_tokens(db: AsyncSession):
+    """Delete tokens that can no longer be used or tell us anything. The caller commits.
+
+    Rotated tokens are kept until they expire, since presenting one again is how a leak is detected.
+    """
+    result = await db.execute(
+        delete(RefreshToken).where(or_(
+            RefreshToken.expires_at < datetime.now(timezone.utc),
+            RefreshToken.revoked_reason.in_((LOGOUT, REUSE)),
+        ))
+    )
+    return result.rowcount
+
+async def prune_refresh_tokens_periodically():
+    """Run prune_refresh_tokens every REFRESH_TOKEN_CLEANUP_SECONDS for the app's lifetime."""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                pruned = await prune_refresh_tokens(db)
+                await db.commit()
+            logger.debug(f"🧹 Pruned {pruned} refresh tokens")
+        except Exception:
+            logger.exception("🚨 Refresh token cleanup failed")
+        await asyncio.sleep(REFRESH_TOKEN_CLEANUP_SECONDS)
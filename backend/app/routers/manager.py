@@ -1,64 +1,127 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from typing import Literal, Optional
+from datetime import date, datetime, time, timedelta
 from app import models, schemas
-from app.database import get_db
+from app.database import get_async_db
 from app.oauth import get_current_user
 from app.routers.calculations import recalculate_analysis 
+from app.bulk_load import write_columns_async
+from app.pagination import decode_cursor, encode_cursor, keyset_after
+from app.projection import balance_at
+from app.results import VIRTUAL_RESULTS, PERMANENT, save_snapshot, save_summary
 
 router = APIRouter()
 
-# ✅ 1. Return all analyses (no ending_balance here)
-@router.get("/all-analyses", response_model=List[schemas.AnalysisOut])
-def get_all_analyses_for_manager(
+SortKey = Literal["created_at", "principal", "description", "username", "id"]
+
+
+# ✅ 1. Return one page of analyses (no ending_balance here)
+# Filters, sort and keyset pagination run in SQL; `total` counts every match, `next_cursor` fetches the next page.
+@router.get("/all-analyses", response_model=schemas.AnalysisPage)
+async def get_all_analyses_for_manager(
+    username: Optional[str] = Query(None),
+    description_contains: Optional[str] = Query(None),
+    principal_gt: Optional[float] = Query(None),
+    principal_lt: Optional[float] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    sort_by: SortKey = Query("created_at"),
+    order: Literal["asc", "desc"] = Query("desc"),
+    limit: int = Query(10, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not current_user.is_manager:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access forbidden")
 
-    return db.query(models.AnalysisParameter).all()
+    Analysis = models.AnalysisParameter
+    # Outer join: analyses whose user is gone are listed with user null
+    query = (
+        select(Analysis)
+        .outerjoin(models.User, Analysis.user_id == models.User.id)
+        .options(contains_eager(Analysis.user))
+    )
+    if username:
+        query = query.where(models.User.username.icontains(username, autoescape=True))
+    if description_contains:
+        query = query.where(Analysis.description.icontains(description_contains, autoescape=True))
+    if principal_gt is not None:
+        query = query.where(Analysis.principal >= principal_gt)
+    if principal_lt is not None:
+        query = query.where(Analysis.principal <= principal_lt)
+    if start_date:
+        query = query.where(Analysis.created_at >= datetime.combine(start_date, time.min))
+    if end_date:
+        query = query.where(Analysis.created_at < datetime.combine(end_date + timedelta(days=1), time.min))
+
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
+
+    sort_column = {
+        "created_at": Analysis.created_at,
+        "principal": Analysis.principal,
+        "description": Analysis.description,
+        # Userless analyses sort as an empty username, so the keyset never compares NULLs
+        "username": func.coalesce(models.User.username, ""),
+        "id": Analysis.id,
+    }[sort_by]
+    if cursor:
+        query = query.where(keyset_after(sort_column, Analysis.id, decode_cursor(cursor, sort_by), order))
+    if order == "desc":
+        query = query.order_by(sort_column.desc(), Analysis.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), Analysis.id.asc())
+
+    # One extra row tells whether another page follows
+    rows = (await db.execute(query.add_columns(sort_column.label("sort_key")).limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, sort_key = rows[-1]
+        next_cursor = encode_cursor(sort_by, sort_key, last.id)
 
+    return {"total": total, "items": [analysis for analysis, _ in rows], "next_cursor": next_cursor}
 
-# ✅ 2. Return latest ending_balance for a specific analysis
+
+# ✅ 2. Return ending_balance for a specific analysis (closed form, no result rows needed)
 @router.get("/ending-balance/{analysis_id}")
-def get_latest_ending_balance(
+async def get_latest_ending_balance(
     analysis_id: int,
+    week: Optional[int] = Query(None, ge=0),
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if not current_user.is_manager:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access forbidden")
 
-    last_result = (
-        db.query(models.AnalysisResult)
-        .filter(models.AnalysisResult.analysis_id == analysis_id)
-        .order_by(models.AnalysisResult.week.desc())
-        .first()
-    )
-
-    if not last_result:
-        raise HTTPException(status_code=404, detail="No results found for this analysis")
+    analysis = await db.get(models.AnalysisParameter, analysis_id)
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
 
     return {
         "analysis_id": analysis_id,
-        "ending_balance": float(last_result.ending_balance)
+        "week": analysis.projection_period if week is None else week,
+        "ending_balance": balance_at(analysis, week)
     }
  
 
 # ✅ 3. Update analysis parameters and recalculate results
 @router.put("/update-analysis/{analysis_id}")
-def update_analysis_for_manager(
+async def update_analysis_for_manager(
     analysis_id: int,
     updated_params: schemas.AnalysisUpdate,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not current_user.is_manager:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access forbidden")
 
     # Fetch the existing analysis
-    analysis = db.query(models.AnalysisParameter).filter(models.AnalysisParameter.id == analysis_id).first()
+    analysis = await db.get(models.AnalysisParameter, analysis_id)
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
 
@@ -67,16 +130,19 @@ def update_analysis_for_manager(
         if field != "id" and hasattr(analysis, field):
             setattr(analysis, field, value)
 
-    db.commit()
-    db.refresh(analysis)
+    await db.commit()
+    await db.refresh(analysis)
 
-    # ✅ Delete old results first
-    db.query(models.AnalysisResult).filter(models.AnalysisResult.analysis_id == analysis_id).delete()
-    db.commit()
+    # ✅ Delete old results first (same transaction as the fresh ones)
+    await db.execute(delete(models.AnalysisResult).where(models.AnalysisResult.analysis_id == analysis_id))
 
-    # ✅ Recalculate and save fresh results
-    new_results = recalculate_analysis(analysis)
-    db.bulk_save_objects(new_results)
-    db.commit()
+    # ✅ Recalculate and save fresh results (just the parameters in virtual mode) with their summary
+    columns = await run_in_threadpool(recalculate_analysis, analysis)
+    if VIRTUAL_RESULTS:
+        await save_snapshot(db, analysis_id, analysis, PERMANENT)
+    else:
+        await write_columns_async(db, models.AnalysisResult, columns, analysis_id=analysis_id)
+    await save_summary(db, analysis_id, columns, analysis.principal)
+    await db.commit()
 
     return {"message": "✅ Analysis updated and recalculated successfully."}
@@ -0,0 +1,247 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+import logging
+import math
+import secrets
+import numpy as np
+from app import models
+from app.database import get_db
+from app.models import User
+from app.oauth import get_current_user
+from app.projection import (
+    final_balances,
+    parallel_map,
+    project_analyses,
+    scenario_columns,
+    simulate_chunk,
+    split_work,
+    sweep_chunk,
+)
+from app.goal_seek import final_balance, goal_seek
+from app.projection_cache import projection_cache
+from app.schemas import BatchProjectionRequest, GoalSeekRequest, MonteCarloRequest, SweepRange, SweepRequest
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Upper bound on scenarios x weeks evaluated in one request (~40 MB per column)
+MAX_PROJECTION_CELLS = 5_000_000
+# Monte Carlo keeps every path in memory for the percentiles (~160 MB at the limit)
+MAX_SIMULATION_CELLS = 20_000_000
+# Paths per seeded block; fixed so a seed gives the same bands however the work is split
+PATHS_PER_CHUNK = 2_000
+# Longest horizon a sweep's projection_period axis may ask for
+MAX_SWEEP_PERIOD = MAX_PROJECTION_CELLS
+
+
+def check_projection_size(scenarios: int, weeks: int):
+    if scenarios * weeks > MAX_PROJECTION_CELLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Request covers {scenarios * weeks} scenario-weeks; the limit is {MAX_PROJECTION_CELLS}",
+        )
+
+
+def check_simulation_size(paths: int, weeks: int):
+    # A zero-week horizon still costs one seed and one result row per path
+    cells = paths * max(weeks, 1)
+    if cells > MAX_SIMULATION_CELLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Simulation covers {cells} path-weeks; the limit is {MAX_SIMULATION_CELLS}",
+        )
+
+# ✅ Evaluate many scenarios in one vectorized call, nothing is persisted
+@router.post("/batch")
+def batch_projection(request: BatchProjectionRequest, current_user: User = Depends(get_current_user)):
+    scenarios = request.scenarios
+    if not scenarios:
+        return {"count": 0, "results": []}
+
+    periods = [s.projection_period for s in scenarios]
+    check_projection_size(len(scenarios), max(max(periods), 0))
+
+    columns = project_analyses(scenarios)
+    endings = final_balances(columns, periods, [s.principal for s in scenarios]).tolist()
+    logger.info(f"Batch projection of {len(scenarios)} scenarios for user {current_user.id}")
+
+    results = []
+    for index, scenario in enumerate(scenarios):
+        result = {
+            "index": index,
+            "description": scenario.description,
+            "ending_balance": endings[index],
+        }
+        if request.include_weekly:
+            weekly = scenario_columns(columns, index, scenario.projection_period)
+            result["weekly"] = {name: values.tolist() for name, values in weekly.items()}
+        results.append(result)
+
+    return {"count": len(results), "results": results}
+
+
+# Parameters that can be swept, in the order their axes appear in the grid
+SWEEP_FIELDS = ("interest_week", "tax_rate", "additional_deposit", "projection_period")
+
+
+def sweep_values(field: str, sweep: SweepRange):
+    if sweep.values is not None:
+        values = np.asarray(sweep.values, dtype=float)
+    elif sweep.start is not None and sweep.stop is not None:
+        values = np.linspace(sweep.start, sweep.stop, sweep.steps)
+    else:
+        raise HTTPException(status_code=400, detail=f"{field}: give either values or start, stop and steps")
+    if values.size == 0:
+        raise HTTPException(status_code=400, detail=f"{field}: sweep has no values")
+    if field == "projection_period":
+        # Checked before the cast, which would wrap huge or non-finite values into garbage horizons
+        if not np.isfinite(values).all() or values.max() > MAX_SWEEP_PERIOD:
+            raise HTTPException(
+                status_code=422,
+                detail=f"{field}: values must be finite and at most {MAX_SWEEP_PERIOD} weeks",
+            )
+        values = np.unique(np.maximum(np.round(values), 0)).astype(int)
+    return values
+
+
+# ✅ Sensitivity grid of ending balances (and optionally full curves), nothing is persisted
+@router.post("/sweep")
+def parameter_sweep(request: SweepRequest, current_user: User = Depends(get_current_user)):
+    # Bound the grid from the requested axis lengths before allocating any of it
+    requested = [getattr(request, field) for field in SWEEP_FIELDS if getattr(request, field) is not None]
+    check_projection_size(math.prod(len(s.values) if s.values is not None else s.steps for s in requested), 1)
+
+    axes = {}
+    for field in SWEEP_FIELDS:
+        sweep = getattr(request, field)
+        if sweep is not None:
+            axes[field] = sweep_values(field, sweep)
+
+    shape = tuple(values.size for values in axes.values())
+    cells = int(np.prod(shape))
+    longest = int(axes["projection_period"].max()) if "projection_period" in axes else request.base.projection_period
+    check_projection_size(cells, max(longest, 1) if request.include_curves else 1)
+
+    # Every grid cell starts from the base scenario; swept fields vary along their own axis
+    base = request.base.dict()
+    grids = dict(zip(axes, np.meshgrid(*axes.values(), indexing="ij")))
+    columns = {
+        field: (grids[field] if field in grids else np.full(shape, base[field] or 0.0, dtype=float)).ravel()
+        for field in (
+            "principal", "interest_week", "tax_rate", "projection_period", "additional_deposit",
+            "deposit_frequency", "regular_withdrawal", "withdrawal_frequency",
+        )
+    }
+
+    weeks_per_cell = max(longest, 1) if request.include_curves else 1
+    work = cells * weeks_per_cell
+    chunks = [
+        ({field: values[lo:hi] for field, values in columns.items()}, request.include_curves)
+        for lo, hi in split_work(cells, weeks_per_cell)
+    ]
+    parts = parallel_map(sweep_chunk, chunks, work)
+    logger.info(f"Sweep of {cells} cells in {len(chunks)} chunk(s) for user {current_user.id}")
+
+    response = {
+        "axes": {field: values.tolist() for field, values in axes.items()},
+        "ending_balance": np.concatenate([endings for endings, _ in parts]).reshape(shape).tolist(),
+    }
+    if request.include_curves:
+        # Flattened in the same row-major order as the ending_balance grid
+        response["curves"] = [curve for _, curves in parts for curve in curves]
+    return response
+
+
+# ✅ Monte Carlo projection with stochastic weekly rates, nothing is persisted
+@router.post("/monte-carlo/{analysis_id}")
+def monte_carlo_projection(
+    analysis_id: int,
+    request: MonteCarloRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    analysis = db.query(models.AnalysisParameter).filter(models.AnalysisParameter.id == analysis_id).first()
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    if not current_user.is_manager and analysis.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this analysis")
+
+    weeks = max(analysis.projection_period, 0)
+    check_simulation_size(request.paths, weeks)
+    if request.distribution == "uniform" and (request.low is None or request.high is None):
+        raise HTTPException(status_code=400, detail="Uniform distribution needs low and high")
+    if request.distribution == "uniform" and request.low > request.high:
+        raise HTTPException(status_code=400, detail="low must not be above high")
+    if any(p < 0 or p > 100 for p in request.percentiles):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+
+    distribution = {
+        "kind": request.distribution,
+        "mean": analysis.interest_week if request.mean is None else request.mean,
+        "std": request.std,
+        "degrees_of_freedom": request.degrees_of_freedom,
+        "low": request.low,
+        "high": request.high,
+    }
+    fields = {
+        field: getattr(analysis, field)
+        for field in (
+            "principal", "projection_period", "tax_rate", "additional_deposit",
+            "deposit_frequency", "regular_withdrawal", "withdrawal_frequency",
+        )
+    }
+
+    # One child seed per fixed-size block of paths keeps results reproducible;
+    # generated seeds stay within 53 bits so JavaScript clients can send them back
+    seed = request.seed if request.seed is not None else secrets.randbits(53)
+    seed_sequence = np.random.SeedSequence(seed)
+    sizes = [min(PATHS_PER_CHUNK, request.paths - start) for start in range(0, request.paths, PATHS_PER_CHUNK)]
+    chunks = [(fields, distribution, size, child) for size, child in zip(sizes, seed_sequence.spawn(len(sizes)))]
+    endings = np.concatenate(parallel_map(simulate_chunk, chunks, request.paths * weeks))
+    logger.info(f"Monte Carlo for analysis {analysis_id}: {request.paths} paths over {weeks} weeks")
+
+    bands = np.percentile(endings, request.percentiles, axis=0) if weeks else np.empty((len(request.percentiles), 0))
+    return {
+        "analysis_id": analysis_id,
+        "paths": request.paths,
+        "seed": seed,
+        "distribution": distribution,
+        "week": list(range(1, weeks + 1)),
+        "mean": endings.mean(axis=0).tolist(),
+        "percentiles": {f"p{p:g}": band.tolist() for p, band in zip(request.percentiles, bands)},
+    }
+
+
+# ✅ Goal seek: solve one parameter for a target ending balance, nothing is persisted
+@router.post("/goal-seek")
+def goal_seek_projection(request: GoalSeekRequest, current_user: User = Depends(get_current_user)):
+    if request.solve_for == "interest_week" and request.lower >= request.upper:
+        raise HTTPException(status_code=400, detail="lower must be below upper")
+    try:
+        value, method, solved = goal_seek(
+            request.base,
+            request.target_balance,
+            request.solve_for,
+            lower=request.lower,
+            upper=request.upper,
+            max_period=request.max_period,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "solve_for": request.solve_for,
+        "value": value,
+        "method": method,
+        "target_balance": request.target_balance,
+        "achieved_balance": final_balance(solved),
+        "parameters": solved,
+    }
+
+
+# ✅ Hit/miss counters of the shared projection cache
+@router.get("/cache-stats")
+def projection_cache_stats(current_user: User = Depends(get_current_user)):
+    if not current_user.is_manager:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return projection_cache.stats()
@@ -1,15 +1,42 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from app.database import get_db
-from app.models import AnalysisResult, AnalysisParameter, User
-from typing import Optional
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from app.database import get_async_db
+from app.pagination import decode_cursor, encode_cursor, keyset_after
+from app.models import AnalysisResult, AnalysisParameter, ResultSnapshot, User
+from app.results import VIRTUAL_RESULTS, PERMANENT
+from typing import Literal, Optional
 from datetime import datetime
 
 router = APIRouter(tags=["Queries"])
 
+SortKey = Literal["generated_at", "principal", "description", "id"]
+
+
+def latest_results(dialect: str, filters):
+    """(analysis_id, generated_at) of the most recent saved result row per analysis."""
+    if dialect == "postgresql":
+        return (
+            select(AnalysisResult.analysis_id, AnalysisResult.generated_at)
+            .where(*filters)
+            .distinct(AnalysisResult.analysis_id)
+            .order_by(AnalysisResult.analysis_id, AnalysisResult.generated_at.desc())
+            .subquery("latest")
+        )
+
+    rank = func.row_number().over(
+        partition_by=AnalysisResult.analysis_id, order_by=AnalysisResult.generated_at.desc()
+    ).label("rank")
+    ranked = select(AnalysisResult.analysis_id, AnalysisResult.generated_at, rank).where(*filters).subquery()
+    return select(ranked.c.analysis_id, ranked.c.generated_at).where(ranked.c.rank == 1).subquery("latest")
+
+
+# ✅ Latest saved result per analysis, deduplicated, filtered and paginated by keyset in SQL.
+# Ending balances come from the stored summary columns. Without `limit` every match is returned;
+# with it, X-Next-Cursor carries the cursor of the next page.
 @router.get("/analyses")
-def query_analyses(
+async def query_analyses(
+    response: Response,
     username: Optional[str] = Query(None),
     description_contains: Optional[str] = Query(None),
     principal_gt: Optional[float] = Query(None),
@@ -18,14 +45,38 @@ def query_analyses(
     ending_balance_lt: Optional[float] = Query(None),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    sort_by: SortKey = Query("generated_at"),
+    order: Literal["asc", "desc"] = Query("desc"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = (
-        db.query(AnalysisResult, AnalysisParameter, User)
-        .join(AnalysisParameter, AnalysisResult.analysis_id == AnalysisParameter.id)
-        .join(User, AnalysisParameter.user_id == User.id)
-        .order_by(desc(AnalysisResult.generated_at))
-    )
+    # Saved results are either weekly rows or, in virtual mode, one snapshot per analysis
+    Result = ResultSnapshot if VIRTUAL_RESULTS else AnalysisResult
+    result_filters = []
+    if start_date:
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        result_filters.append(Result.generated_at >= start_dt)
+    if end_date:
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+        result_filters.append(Result.generated_at <= end_dt)
+
+    if VIRTUAL_RESULTS:
+        # The permanent snapshot is already unique per analysis
+        generated_at = ResultSnapshot.generated_at
+        query = (
+            select(ResultSnapshot, AnalysisParameter, User)
+            .join(AnalysisParameter, ResultSnapshot.analysis_id == AnalysisParameter.id)
+            .where(ResultSnapshot.kind == PERMANENT, *result_filters)
+        )
+    else:
+        latest = latest_results(db.bind.dialect.name, result_filters)
+        generated_at = latest.c.generated_at
+        query = (
+            select(generated_at, AnalysisParameter, User)
+            .join(AnalysisParameter, latest.c.analysis_id == AnalysisParameter.id)
+        )
+    query = query.join(User, AnalysisParameter.user_id == User.id)
 
     if username:
         query = query.filter(User.username.ilike(f"%{username}%"))
@@ -36,34 +87,45 @@ def query_analyses(
     if principal_lt is not None:
         query = query.filter(AnalysisParameter.principal <= principal_lt)
     if ending_balance_gt is not None:
-        query = query.filter(AnalysisResult.ending_balance >= ending_balance_gt)
+        query = query.filter(AnalysisParameter.final_balance >= ending_balance_gt)
     if ending_balance_lt is not None:
-        query = query.filter(AnalysisResult.ending_balance <= ending_balance_lt)
-    if start_date:
-        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-        query = query.filter(AnalysisResult.generated_at >= start_dt)
-    if end_date:
-        end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-        query = query.filter(AnalysisResult.generated_at <= end_dt)
+        query = query.filter(AnalysisParameter.final_balance <= ending_balance_lt)
 
-    seen_ids = set()
-    response = []
+    sort_column = {
+        "generated_at": generated_at,
+        "principal": AnalysisParameter.principal,
+        "description": AnalysisParameter.description,
+        "id": AnalysisParameter.id,
+    }[sort_by]
+    if order == "desc":
+        query = query.order_by(sort_column.desc(), AnalysisParameter.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), AnalysisParameter.id.asc())
+    query = query.add_columns(sort_column.label("sort_key"))
 
-    for result, param, user in query.all():
-        if result.analysis_id in seen_ids:
-            continue
-        seen_ids.add(result.analysis_id)
+    if cursor:
+        query = query.where(keyset_after(sort_column, AnalysisParameter.id, decode_cursor(cursor, sort_by), order))
+    if limit is not None:
+        query = query.limit(limit)
+    rows = (await db.execute(query)).all()
 
-        response.append({
-            "id": result.analysis_id,
+    response_rows = []
+    for source, param, user, _ in rows:
+        generated = source.generated_at if VIRTUAL_RESULTS else source
+        response_rows.append({
+            "id": param.id,
             "username": user.username,
             "description": param.description,
             "principal": param.principal,
-            "ending_balance": result.ending_balance,
-            "generated_at": result.generated_at.isoformat() if result.generated_at else None
+            "ending_balance": param.final_balance,
+            "generated_at": generated.isoformat() if generated else None
         })
 
-    return response
+    if limit is not None and len(rows) == limit:
+        _, last, _, sort_key = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(sort_by, sort_key, last.id)
+
+    return response_rows
 
 @router.get("/test")
 def test_route():
@@ -1,30 +1,37 @@
 # app/routers/reports.py
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from datetime import datetime
 from io import StringIO
 import csv
+import logging
 import pytz
 from pytz.exceptions import UnknownTimeZoneError
 
-from app.database import get_db
-from app.models import AnalysisResult, AnalysisParameter, User
+from app.database import AsyncSessionLocal, get_async_db
+from app.models import AnalysisResult, AnalysisParameter, ResultSnapshot, User
+from app.results import VIRTUAL_RESULTS, PERMANENT, snapshot_rows
 from app.schemas import AnalysisResultSchema
 from app.utils.auth_utils import get_current_manager
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Rows fetched per server-side cursor round trip, and per CSV chunk flushed to the client
+EXPORT_BATCH_ROWS = 1000
 
 # ✅ 1. Download CSV Report
 @router.get("/manager/reports/financial")
-def generate_financial_report(
+async def generate_financial_report(
     username: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     timezone: str = Query("UTC"),
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_manager)
 ):
     try:
@@ -32,60 +39,95 @@ def generate_financial_report(
     except UnknownTimeZoneError:
         raise HTTPException(status_code=400, detail="Invalid timezone.")
 
-    query = db.query(AnalysisResult).join(AnalysisResult.analysis).join(AnalysisParameter.user)
+    Result = ResultSnapshot if VIRTUAL_RESULTS else AnalysisResult
+    # Only the exported columns; in virtual mode the snapshot itself, to expand into weeks
+    exported = (Result,) if VIRTUAL_RESULTS else (Result.week, Result.ending_balance, Result.generated_at)
+    query = (
+        select(*exported, User.username, AnalysisParameter.principal)
+        .join(AnalysisParameter, Result.analysis_id == AnalysisParameter.id)
+        .join(User, AnalysisParameter.user_id == User.id)
+    )
+    if VIRTUAL_RESULTS:
+        query = query.filter(ResultSnapshot.kind == PERMANENT)
 
     if username:
         query = query.filter(User.username.ilike(f"%{username}%"))
     if start_date:
         start_utc = tz.localize(datetime.strptime(start_date, "%Y-%m-%d")).astimezone(pytz.UTC)
-        query = query.filter(AnalysisResult.generated_at >= start_utc)
+        query = query.filter(Result.generated_at >= start_utc)
     if end_date:
         end_utc = tz.localize(datetime.strptime(end_date, "%Y-%m-%d")).astimezone(pytz.UTC)
-        query = query.filter(AnalysisResult.generated_at <= end_utc)
+        query = query.filter(Result.generated_at <= end_utc)
 
-    results = query.all()
-
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["ID", "Username", "Principal", "Ending Balance", "Generated At"])
-
-    for r in results:
-        writer.writerow([
-            r.id,
-            r.analysis.user.username if r.analysis and r.analysis.user else "-",
-            f"{r.analysis.principal:,.2f}" if r.analysis else "-",
-            f"{r.ending_balance or 0:,.2f}",
-            r.generated_at.strftime("%Y-%m-%d %H:%M:%S") if r.generated_at else "-"
-        ])
-
-    output.seek(0)
     return StreamingResponse(
-        output,
+        financial_report_csv(query),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=financial_report.csv"}
     )
 
+
+async def financial_report_csv(query):
+    """Yield the CSV export one chunk per EXPORT_BATCH_ROWS rows, read through a server-side cursor.
+
+    Runs in its own session: the request's session is closed before a streamed body is sent.
+    """
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["Week", "Username", "Principal", "Ending Balance", "Generated At"])
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_ROWS))
+        async for partition in result.partitions():
+            if VIRTUAL_RESULTS:
+                # Each snapshot expands into its weekly rows
+                weekly = await run_in_threadpool(snapshot_rows, [snapshot for snapshot, _, _ in partition])
+                owners = {snapshot.analysis_id: (user, principal) for snapshot, user, principal in partition}
+                rows = [(row["week"], row["ending_balance"], row["generated_at"], *owners[row["analysis_id"]]) for row in weekly]
+            else:
+                rows = partition
+
+            for week, ending_balance, generated_at, user, principal in rows:
+                writer.writerow([
+                    week,
+                    user or "-",
+                    f"{principal:,.2f}" if principal is not None else "-",
+                    f"{ending_balance or 0:,.2f}",
+                    generated_at.strftime("%Y-%m-%d %H:%M:%S") if generated_at else "-"
+                ])
+
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+
+    if output.tell():
+        # Header only, nothing matched
+        yield output.getvalue()
+
 # ✅ 2. Fetch Reports (Table view)
 @router.get("/reports", response_model=List[AnalysisResultSchema])
-def get_reports(
+async def get_reports(
     username: Optional[str] = Query(None),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_manager)
 ):
     try:
-        query = db.query(AnalysisResult).join(AnalysisResult.analysis).join(AnalysisParameter.user)
+        Result = ResultSnapshot if VIRTUAL_RESULTS else AnalysisResult
+        query = select(Result).join(Result.analysis).join(AnalysisParameter.user)
+        if VIRTUAL_RESULTS:
+            query = query.filter(ResultSnapshot.kind == PERMANENT)
 
         if username:
             query = query.filter(User.username.ilike(f"%{username}%"))
         if start_date:
-            query = query.filter(AnalysisResult.generated_at >= start_date)
+            query = query.filter(Result.generated_at >= start_date)
         if end_date:
-            query = query.filter(AnalysisResult.generated_at <= end_date)
+            query = query.filter(Result.generated_at <= end_date)
 
-        return query.all()
+        results = (await db.execute(query)).scalars().all()
+        return await run_in_threadpool(snapshot_rows, results) if VIRTUAL_RESULTS else results
 
     except Exception as e:
-        print("❌ Error fetching reports:", str(e))
+        logger.exception(f"❌ Error fetching reports: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch reports.")
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from datetime import datetime
 
 class UserOut(BaseModel):
@@ -19,6 +19,68 @@ class AnalysisCreate(BaseModel):
     regular_withdrawal: Optional[float] = None
     withdrawal_frequency: Optional[int] = None
 
+class BatchProjectionRequest(BaseModel):
+    scenarios: List[AnalysisCreate]
+    include_weekly: bool = True
+
+# Most points one sweep axis may have
+MAX_SWEEP_STEPS = 10_000
+
+class SweepRange(BaseModel):
+    # Either explicit values, or `steps` evenly spaced points from start to stop
+    values: Optional[List[float]] = Field(None, max_length=MAX_SWEEP_STEPS)
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: int = Field(10, gt=0, le=MAX_SWEEP_STEPS)
+
+class SweepRequest(BaseModel):
+    base: AnalysisCreate
+    interest_week: Optional[SweepRange] = None
+    tax_rate: Optional[SweepRange] = None
+    additional_deposit: Optional[SweepRange] = None
+    projection_period: Optional[SweepRange] = None
+    include_curves: bool = False
+
+# Most paths one Monte Carlo request may simulate, whatever the horizon
+MAX_SIMULATION_PATHS = 20_000_000
+
+class MonteCarloRequest(BaseModel):
+    # Weekly rates are drawn around the analysis' own interest_week unless overridden
+    distribution: Literal["normal", "t", "uniform"] = "normal"
+    mean: Optional[float] = None
+    std: float = Field(0.5, ge=0)
+    degrees_of_freedom: float = Field(5.0, gt=0)
+    low: Optional[float] = None
+    high: Optional[float] = None
+    paths: int = Field(10_000, gt=0, le=MAX_SIMULATION_PATHS)
+    seed: Optional[int] = Field(None, ge=0)
+    percentiles: List[float] = [5, 50, 95]
+
+# Longest horizon goal seek scans (~2,000 years); every horizon is evaluated at once
+MAX_GOAL_SEEK_PERIOD = 104_000
+
+class GoalSeekRequest(BaseModel):
+    base: AnalysisCreate
+    target_balance: float
+    solve_for: Literal["additional_deposit", "interest_week", "regular_withdrawal", "projection_period"]
+    # Search bracket for interest_week, in percent per week
+    lower: float = -10.0
+    upper: float = 10.0
+    max_period: int = Field(5200, gt=0, le=MAX_GOAL_SEEK_PERIOD)
+
+class ProjectionJobOut(BaseModel):
+    id: int
+    analysis_id: int
+    status: str
+    progress: float
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class AnalysisResultSchema(BaseModel):
     id: int
     analysis_id: int
@@ -45,7 +107,21 @@ class AnalysisOut(BaseModel):
     withdrawal_frequency: Optional[int]
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
-    user: UserOut
+    final_balance: Optional[float] = None
+    total_deposits: Optional[float] = None
+    total_withdrawals: Optional[float] = None
+    total_tax: Optional[float] = None
+    total_interest: Optional[float] = None
+    computed_at: Optional[datetime] = None
+    user: Optional[UserOut] = None
+
+class AnalysisBatchItem(AnalysisOut):
+    ending_balance: Optional[float] = None
+    results: Optional[List[AnalysisResultSchema]] = None
+
+class AnalysisBatchOut(BaseModel):
+    items: List[AnalysisBatchItem]
+    missing: List[int]
 
 class AnalysisWithUserOut(BaseModel):
     id: int
@@ -63,6 +139,11 @@ class AnalysisWithUserOut(BaseModel):
     ending_balance: Optional[float] = None 
     user: Optional[UserOut]
 
+class AnalysisPage(BaseModel):
+    total: int
+    items: List[AnalysisOut]
+    next_cursor: Optional[str] = None
+
 class AnalysisUpdate(BaseModel):
     description: Optional[str]
     principal: Optional[float]
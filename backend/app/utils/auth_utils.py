@@ -1,40 +1,4 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User
-import os
+# Authentication lives in app.oauth; these names are kept for existing imports
+from app.oauth import Principal, get_current_manager, get_current_user, oauth2_scheme, principal_cache
 
-SECRET_KEY = os.getenv("JWT_SECRET_KEY", "mysecret")
-ALGORITHM = "HS256"
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")  # This matches the route in your auth router
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
-    return user
-
-def get_current_manager(user: User = Depends(get_current_user)) -> User:
-    if not user.is_manager:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only managers are authorized to access this route.",
-        )
-    return user
+__all__ = ["Principal", "get_current_manager", "get_current_user", "oauth2_scheme", "principal_cache"]
@@ -0,0 +1,125 @@
+"""Convert stored results between weekly rows and virtual snapshots before flipping VIRTUAL_RESULTS.
+
+With VIRTUAL_RESULTS on, readers only look at result_snapshots; with it off,
+only at the weekly result tables. Run this with the target mode first, then
+switch the flag, so analyses computed under the old mode stay visible:
+
+    python -m scripts.convert_results --to virtual          # before turning VIRTUAL_RESULTS on
+    python -m scripts.convert_results --to materialized     # before turning it off
+
+--to virtual writes a snapshot for every analysis that has weekly rows but no
+snapshot of that kind. The snapshot takes the analysis' current parameters and
+is only written when they reproduce the stored rows (same number of weeks and
+the same final balance); analyses edited since their rows were saved are
+listed instead, and --force snapshots them anyway. Weekly rows are left in
+place, so the conversion can be re-run or reversed.
+
+--to materialized writes the weekly rows of every snapshot whose analysis has
+none, keeping the snapshot's generated_at. Use --dry-run to only report.
+"""
+import argparse
+import math
+from sqlalchemy import and_, func, select
+from app import models
+from app.bulk_load import write_columns
+from app.database import SessionLocal
+from app.projection import balance_at, project_analysis
+from app.results import FINANCIAL_FIELDS, PERMANENT, STAGING
+
+# Weekly tables backing each snapshot kind; the first one is compared against on --to virtual
+TABLES = {
+    STAGING: (models.StagingResult,),
+    PERMANENT: (models.AnalysisResult, models.PermanentResult),
+}
+
+def unsnapshotted_rows(db, kind):
+    """(analysis, weeks, last ending_balance, latest generated_at) of analyses with rows but no snapshot."""
+    Result = TABLES[kind][0]
+    stats = (
+        select(
+            Result.analysis_id,
+            func.count().label("weeks"),
+            func.max(Result.week).label("last_week"),
+            func.max(Result.generated_at).label("generated_at"),
+        )
+        .group_by(Result.analysis_id)
+        .subquery()
+    )
+    snapshot = models.ResultSnapshot
+    return db.execute(
+        select(models.AnalysisParameter, stats.c.weeks, Result.ending_balance, stats.c.generated_at)
+        .join(stats, stats.c.analysis_id == models.AnalysisParameter.id)
+        .join(Result, and_(Result.analysis_id == stats.c.analysis_id, Result.week == stats.c.last_week))
+        .outerjoin(snapshot, and_(snapshot.analysis_id == models.AnalysisParameter.id, snapshot.kind == kind))
+        .where(snapshot.id.is_(None))
+        .order_by(models.AnalysisParameter.id)
+    ).all()
+
+
+def reproduces(analysis, weeks, ending_balance):
+    if weeks != max(analysis.projection_period, 0):
+        return False
+    return math.isclose(balance_at(analysis), ending_balance, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def to_virtual(db, force):
+    created, mismatched = 0, []
+    for kind in (STAGING, PERMANENT):
+        for analysis, weeks, ending_balance, generated_at in unsnapshotted_rows(db, kind):
+            if not reproduces(analysis, weeks, ending_balance):
+                mismatched.append((kind, analysis.id))
+                if not force:
+                    continue
+            db.add(models.ResultSnapshot(
+                analysis_id=analysis.id,
+                kind=kind,
+                generated_at=generated_at,
+                **{field: getattr(analysis, field) for field in FINANCIAL_FIELDS},
+            ))
+            created += 1
+    return created, mismatched
+
+
+def to_materialized(db):
+    written = 0
+    snapshots = db.execute(select(models.ResultSnapshot).order_by(models.ResultSnapshot.id)).scalars().all()
+    for snapshot in snapshots:
+        tables = TABLES[snapshot.kind]
+        has_rows = db.execute(
+            select(tables[0].id).where(tables[0].analysis_id == snapshot.analysis_id).limit(1)
+        ).first()
+        if has_rows:
+            continue
+        columns = project_analysis(snapshot)
+        for model in tables:
+            write_columns(db, model, columns, analysis_id=snapshot.analysis_id, generated_at=snapshot.generated_at)
+        written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--to", choices=("virtual", "materialized"), required=True)
+    parser.add_argument("--force", action="store_true", help="snapshot analyses whose rows no longer match")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.to == "virtual":
+            created, mismatched = to_virtual(db, args.force)
+            print(f"{created} snapshot(s) to write")
+            for kind, analysis_id in mismatched:
+                action = "snapshotted anyway" if args.force else "skipped"
+                print(f"  analysis {analysis_id}: {kind} rows do not match its parameters, {action}")
+        else:
+            print(f"{to_materialized(db)} snapshot(s) to expand into weekly rows")
+
+        if args.dry_run:
+            db.rollback()
+            print("Dry run, nothing written")
+        else:
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,5 +3,9 @@
 # Navigate into the backend directory
 cd "$(dirname "$0")"
 
+# Per-worker metric files behind /metrics; cleared on start so samples of old workers don't linger
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus-multiproc}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 # Start the FastAPI app
 uvicorn app.main:app --host 0.0.0.0 --port $PORT
@@ -0,0 +1,4 @@
+import os
+
+# app.database refuses to import without a URL; these tests never open a connection
+os.environ.setdefault("DATABASE_URL", "sqlite://")
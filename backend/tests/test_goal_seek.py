@@ -0,0 +1,42 @@
+"""Goal seek solvers against the closed-form balance they invert.
+
+Run from backend/: python -m pytest tests
+"""
+import numpy as np
+import pytest
+
+from app import goal_seek
+from app.goal_seek import final_balance, solve_rate
+
+FIELDS = {
+    "principal": 1000,
+    "interest_week": 1,
+    "projection_period": 52,
+    "tax_rate": 10,
+    "additional_deposit": 20,
+    "deposit_frequency": 4,
+    "regular_withdrawal": 0,
+    "withdrawal_frequency": 0,
+}
+
+
+@pytest.mark.parametrize("target", [800, 1500, 2500])
+def test_solve_rate_reaches_target(target):
+    rate = solve_rate(FIELDS, target, -10, 10)
+    assert final_balance(FIELDS, interest_week=rate) == pytest.approx(target, rel=1e-6)
+
+
+def test_solve_rate_skips_overflowing_candidates():
+    # Past about 0.7% a week the 100,000-week balance overflows to inf - inf = nan,
+    # which used to read as a crossing and came back as a nan "solution"
+    fields = {**FIELDS, "projection_period": 100_000, "regular_withdrawal": 10, "withdrawal_frequency": 1}
+    assert np.isnan(final_balance(fields, interest_week=5.0))
+    with pytest.raises(ValueError):
+        solve_rate(fields, 1e6, 0.5, 50)
+
+
+def test_solve_rate_rejects_a_jump_across_the_target(monkeypatch):
+    # A sign change without a root: the bracket narrows onto the jump, never onto the target
+    monkeypatch.setattr(goal_seek, "final_balance", lambda fields, interest_week: np.where(interest_week < 1, 0.0, 2000.0))
+    with pytest.raises(ValueError):
+        solve_rate(FIELDS, 1000, -10, 10)
@@ -0,0 +1,93 @@
+"""Pin the vectorized projection engine to the original week-by-week loop.
+
+Run from backend/: python -m pytest tests
+"""
+import random
+
+import numpy as np
+import pytest
+
+from app.projection import closed_form_balance, project, project_batch
+
+
+def reference_loop(principal, interest_week, projection_period, tax_rate,
+                   additional_deposit, deposit_frequency, regular_withdrawal, withdrawal_frequency):
+    # The per-week recurrence that calculations.recalculate_analysis used before the engine existed
+    rows = []
+    beginning_balance = principal
+    for week in range(1, projection_period + 1):
+        interest = beginning_balance * (interest_week / 100)
+        profit = interest
+        tax_deduction = profit * (tax_rate / 100)
+        deposit = additional_deposit if deposit_frequency and week % deposit_frequency == 0 else 0
+        withdrawal = regular_withdrawal if withdrawal_frequency and week % withdrawal_frequency == 0 else 0
+        ending_balance = beginning_balance + deposit + profit - withdrawal - tax_deduction
+        rows.append({
+            "week": week,
+            "beginning_balance": beginning_balance,
+            "additional_deposit": deposit,
+            "interest": interest,
+            "profit": profit,
+            "tax_deduction": tax_deduction,
+            "withdrawal": withdrawal,
+            "ending_balance": ending_balance,
+        })
+        beginning_balance = ending_balance
+    return rows
+
+
+CASES = [
+    # principal, interest_week, period, tax_rate, deposit, deposit_freq, withdrawal, withdrawal_freq
+    (1000, 1, 10, 10, 50, 2, 10, 3),
+    (5000, 0, 52, 0, 100, 1, 0, 1),
+    (2500, -0.5, 104, 20, 25, 4, 40, 13),      # negative growth
+    (10000, 0.2, 520, 35, 0, 0, 75, 26),      # deposits disabled, withdrawals only
+    (100, 3, 1, 15, 10, 7, 5, 7),
+    (750, 1.5, 0, 10, 50, 2, 10, 3),          # empty projection
+    (1000, -150, 12, 0, 20, 3, 0, 1),         # growth factor below zero
+]
+
+
+def random_cases(count, seed=1234):
+    rng = random.Random(seed)
+    return [
+        (
+            rng.uniform(0, 1e6), rng.uniform(-2, 5), rng.randint(0, 600), rng.uniform(0, 60),
+            rng.uniform(0, 5e3), rng.randint(0, 12), rng.uniform(0, 5e3), rng.randint(0, 12),
+        )
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("case", CASES + random_cases(200))
+def test_project_matches_reference_loop(case):
+    expected = reference_loop(*case)
+    columns = project(*case)
+
+    assert columns["week"].tolist() == [row["week"] for row in expected]
+    for name in ("beginning_balance", "additional_deposit", "interest", "profit",
+                 "tax_deduction", "withdrawal", "ending_balance"):
+        np.testing.assert_allclose(
+            columns[name], [row[name] for row in expected], rtol=1e-9, atol=1e-6, err_msg=name
+        )
+
+
+@pytest.mark.parametrize("case", CASES + random_cases(200, seed=99))
+def test_closed_form_balance_matches_reference_loop(case):
+    principal, interest_week, period, tax_rate, deposit, deposit_freq, withdrawal, withdrawal_freq = case
+    expected = reference_loop(*case)
+    final = expected[-1]["ending_balance"] if expected else principal
+
+    balance = closed_form_balance(
+        period, principal, interest_week, tax_rate, deposit, deposit_freq, withdrawal, withdrawal_freq
+    )
+    assert balance == pytest.approx(final, rel=1e-9, abs=1e-6)
+
+
+def test_project_batch_rows_match_single_projections():
+    cases = CASES[:5]
+    columns = project_batch(*(list(values) for values in zip(*cases)))
+    for index, case in enumerate(cases):
+        period = case[2]
+        expected = [row["ending_balance"] for row in reference_loop(*case)]
+        np.testing.assert_allclose(columns["ending_balance"][index, :period], expected, rtol=1e-9, atol=1e-6)
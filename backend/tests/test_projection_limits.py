@@ -0,0 +1,39 @@
+"""Request bounds on the projection endpoints, checked before any work is allocated.
+
+Run from backend/: python -m pytest tests
+"""
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.routers.projections import MAX_SIMULATION_CELLS, MAX_SWEEP_PERIOD, check_simulation_size, sweep_values
+from app.schemas import MonteCarloRequest, SweepRange
+
+
+@pytest.mark.parametrize("value", [1e30, float("inf"), float("nan"), MAX_SWEEP_PERIOD + 1])
+def test_sweep_rejects_out_of_range_periods(value):
+    with pytest.raises(HTTPException) as error:
+        sweep_values("projection_period", SweepRange(values=[52, value]))
+    assert error.value.status_code == 422
+
+
+def test_sweep_periods_are_rounded_clamped_and_deduplicated():
+    values = sweep_values("projection_period", SweepRange(values=[-3, 0.4, 51.6, 52, MAX_SWEEP_PERIOD]))
+    assert values.tolist() == [0, 52, MAX_SWEEP_PERIOD]
+
+
+def test_monte_carlo_rejects_huge_path_counts():
+    with pytest.raises(ValidationError):
+        MonteCarloRequest(paths=10**12)
+
+
+@pytest.mark.parametrize("paths, weeks", [(10**12, 0), (MAX_SIMULATION_CELLS + 1, 0), (MAX_SIMULATION_CELLS, 2)])
+def test_simulation_size_counts_zero_week_horizons(paths, weeks):
+    with pytest.raises(HTTPException) as error:
+        check_simulation_size(paths, weeks)
+    assert error.value.status_code == 400
+
+
+def test_simulation_size_allows_the_limit():
+    check_simulation_size(MAX_SIMULATION_CELLS, 0)
+    check_simulation_size(MAX_SIMULATION_CELLS // 52, 52)
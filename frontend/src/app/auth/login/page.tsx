@@ -27,6 +27,7 @@ const LoginPage = () => {
       if (!res.ok || !data.access_token) throw new Error("Invalid login");
 
       localStorage.setItem("token", data.access_token);
+      localStorage.setItem("refresh_token", data.refresh_token);
       alert("✅ Logged in!");
       router.push("/create");
     } catch (err: any) {
@@ -16,7 +16,18 @@ export default function Navbar() {
   }, []);
 
   const handleLogout = () => {
+    const refreshToken = localStorage.getItem("refresh_token");
+    if (refreshToken) {
+      // Revoke the session server-side; the redirect does not wait for it
+      fetch(`${process.env.NEXT_PUBLIC_BACKEND_URL}/logout`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+        keepalive: true,
+      }).catch(() => {});
+    }
     localStorage.removeItem("token");
+    localStorage.removeItem("refresh_token");
     window.location.href = "/auth/login";
   };
 
@@ -0,0 +1,29 @@
+"use client";
+
+import { useEffect } from "react";
+import { refreshSession, tokenExpiresInMs } from "@/utils/auth";
+
+// Renew the access token shortly before it expires, so pages reading it from localStorage never see a stale one
+const REFRESH_MARGIN_MS = 2 * 60 * 1000;
+const CHECK_EVERY_MS = 30 * 1000;
+
+export default function TokenRefresher() {
+  useEffect(() => {
+    const check = () => {
+      const remaining = tokenExpiresInMs();
+      if (remaining !== null && remaining < REFRESH_MARGIN_MS) {
+        refreshSession();
+      }
+    };
+
+    check();
+    const timer = setInterval(check, CHECK_EVERY_MS);
+    document.addEventListener("visibilitychange", check);
+    return () => {
+      clearInterval(timer);
+      document.removeEventListener("visibilitychange", check);
+    };
+  }, []);
+
+  return null;
+}
@@ -19,8 +19,15 @@ interface AnalysisData {
   };
 }
 
+interface AnalysisPage {
+  total: number;
+  items: AnalysisData[];
+  next_cursor: string | null;
+}
+
 export default function ManagerDashboard() {
   const [analyses, setAnalyses] = useState<AnalysisData[]>([]);
+  const [total, setTotal] = useState(0);
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
   const router = useRouter();
@@ -29,6 +36,8 @@ export default function ManagerDashboard() {
   const [principalFilter, setPrincipalFilter] = useState("");
   const [dateFilter, setDateFilter] = useState("");
 
+  // cursors[i] fetches page i + 1; the first page needs none
+  const [cursors, setCursors] = useState<(string | null)[]>([null]);
   const [currentPage, setCurrentPage] = useState(1);
   const itemsPerPage = 10;
 
@@ -41,12 +50,26 @@ export default function ManagerDashboard() {
       }
       setLoading(true);
       try {
-        const res = await axios.get(`${config}/manager/all-analyses`, {
+        const res = await axios.get<AnalysisPage>(`${config}/manager/all-analyses`, {
           headers: {
             Authorization: `Bearer ${token}`,
           },
+          params: {
+            limit: itemsPerPage,
+            cursor: cursors[currentPage - 1] ?? undefined,
+            username: usernameFilter || undefined,
+            principal_lt: principalFilter === "" ? undefined : principalFilter,
+            start_date: dateFilter || undefined,
+            end_date: dateFilter || undefined,
+          },
+        });
+        setAnalyses(res.data.items);
+        setTotal(res.data.total);
+        setCursors((prev) => {
+          const next = prev.slice(0, currentPage);
+          next.push(res.data.next_cursor);
+          return next;
         });
-        setAnalyses(res.data);
       } catch (err) {
         console.error("Error fetching manager data:", err);
         setError("❌ Failed to fetch analyses. Check console for details.");
@@ -56,7 +79,13 @@ export default function ManagerDashboard() {
     };
 
     fetchData();
-  }, []);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [currentPage, usernameFilter, principalFilter, dateFilter]);
+
+  const resetPaging = () => {
+    setCursors([null]);
+    setCurrentPage(1);
+  };
 
   const formatCurrency = (value: number | null | undefined): string =>
     typeof value === "number"
@@ -66,28 +95,8 @@ export default function ManagerDashboard() {
         })
       : "-";
 
-  const filteredData = analyses.filter((a) => {
-    const usernameMatch = a.user?.username
-      .toLowerCase()
-      .includes(usernameFilter.toLowerCase());
-
-    const principalMatch =
-      principalFilter === "" ||
-      a.principal <= parseFloat(principalFilter || "0");
-
-    const dateMatch =
-      dateFilter === "" ||
-      new Date(a.created_at).toLocaleDateString() ===
-        new Date(dateFilter).toLocaleDateString();
-
-    return usernameMatch && principalMatch && dateMatch;
-  });
-
-  const totalPages = Math.ceil(filteredData.length / itemsPerPage);
-  const paginatedData = filteredData.slice(
-    (currentPage - 1) * itemsPerPage,
-    currentPage * itemsPerPage
-  );
+  const totalPages = Math.max(Math.ceil(total / itemsPerPage), 1);
+  const hasNextPage = Boolean(cursors[currentPage]);
 
   return (
     <div className={styles.pageWrapper}>
@@ -108,7 +117,7 @@ export default function ManagerDashboard() {
               value={usernameFilter}
               onChange={(e) => {
                 setUsernameFilter(e.target.value);
-                setCurrentPage(1);
+                resetPaging();
               }}
               placeholder="Filter by Username"
               className={styles.input}
@@ -118,7 +127,7 @@ export default function ManagerDashboard() {
               value={principalFilter}
               onChange={(e) => {
                 setPrincipalFilter(e.target.value);
-                setCurrentPage(1);
+                resetPaging();
               }}
               placeholder="Principal < amount"
               className={styles.input}
@@ -128,7 +137,7 @@ export default function ManagerDashboard() {
               value={dateFilter}
               onChange={(e) => {
                 setDateFilter(e.target.value);
-                setCurrentPage(1);
+                resetPaging();
               }}
               className={styles.input}
             />
@@ -137,7 +146,7 @@ export default function ManagerDashboard() {
                 setUsernameFilter("");
                 setPrincipalFilter("");
                 setDateFilter("");
-                setCurrentPage(1);
+                resetPaging();
               }}
               className={styles.button}
             >
@@ -149,7 +158,7 @@ export default function ManagerDashboard() {
         <div className={styles.tableBox}>
           {loading ? (
             <p>Loading...</p>
-          ) : paginatedData.length > 0 ? (
+          ) : analyses.length > 0 ? (
             <>
               <div style={{ overflowX: "auto" }}>
                 <table className={styles.table}>
@@ -164,7 +173,7 @@ export default function ManagerDashboard() {
                     </tr>
                   </thead>
                   <tbody>
-                    {paginatedData.map((a) => (
+                    {analyses.map((a) => (
                       <tr key={a.id}>
                         <td>{a.id}</td>
                         <td>{a.user?.username || "-"}</td>
@@ -204,26 +213,13 @@ export default function ManagerDashboard() {
                   ⬅ Prev
                 </button>
 
-                {Array.from({ length: totalPages }, (_, idx) => {
-                  const pageNum = idx + 1;
-                  return (
-                    <button
-                      key={pageNum}
-                      onClick={() => setCurrentPage(pageNum)}
-                      className={`${styles.pageBtn} ${
-                        currentPage === pageNum ? styles.activePage : ""
-                      }`}
-                    >
-                      {pageNum}
-                    </button>
-                  );
-                })}
+                <span className={styles.pageBtn}>
+                  Page {currentPage} of {totalPages} ({total} analyses)
+                </span>
 
                 <button
-                  onClick={() =>
-                    setCurrentPage((p) => Math.min(p + 1, totalPages))
-                  }
-                  disabled={currentPage === totalPages}
+                  onClick={() => setCurrentPage((p) => p + 1)}
+                  disabled={!hasNextPage}
                   className={styles.pageBtn}
                 >
                   Next ➡
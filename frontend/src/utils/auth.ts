@@ -40,3 +40,62 @@ export const isManagerFromToken = (): boolean => {
   }
 };
 
+
+let refreshing: Promise<boolean> | null = null;
+
+// Tabs share one refresh token in localStorage, so only one tab may rotate it at a time
+const REFRESH_LOCK = "refresh-session";
+
+const rotateRefreshToken = async (seen: string | null): Promise<boolean> => {
+  const refreshToken = localStorage.getItem("refresh_token");
+  if (!refreshToken) return false;
+  // Another tab rotated it while we waited; its new pair is already stored
+  if (seen && refreshToken !== seen) return true;
+
+  try {
+    const res = await fetch(`${process.env.NEXT_PUBLIC_BACKEND_URL}/refresh`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (!res.ok) {
+      // Only drop the token we sent, never one another tab stored in the meantime
+      if (localStorage.getItem("refresh_token") === refreshToken) {
+        localStorage.removeItem("refresh_token");
+        return false;
+      }
+      return true;
+    }
+    const data = await res.json();
+    localStorage.setItem("token", data.access_token);
+    localStorage.setItem("refresh_token", data.refresh_token);
+    return true;
+  } catch (e) {
+    console.error("Token refresh failed", e);
+    return false;
+  }
+};
+
+// Swap the refresh token for a new token pair; concurrent callers share one request,
+// and tabs take turns through a Web Lock where the browser supports it
+export const refreshSession = (): Promise<boolean> => {
+  if (refreshing) return refreshing;
+
+  const seen = localStorage.getItem("refresh_token");
+  const rotate = () => rotateRefreshToken(seen);
+  refreshing = (navigator.locks ? navigator.locks.request(REFRESH_LOCK, rotate) : rotate()).finally(() => {
+    refreshing = null;
+  });
+  return refreshing;
+};
+
+export const tokenExpiresInMs = (): number | null => {
+  const token = localStorage.getItem("token");
+  if (!token) return null;
+  try {
+    const decoded: DecodedToken = jwtDecode(token);
+    return decoded.exp ? decoded.exp * 1000 - Date.now() : null;
+  } catch (e) {
+    return null;
+  }
+};